@@ -0,0 +1,291 @@
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import dados
+import indices
+import ingestao
+import mensagens
+import previsao
+
+# DuckDB é opcional: sem ele, o banco usa o SQLite da biblioteca padrão
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# Banco embutido com as issues das exportações, para históricos maiores que a memória.
+# A importação lê as exportações em lotes (ingestao.ler_exportacoes_em_lotes, com memória limitada ao
+# lote, qualquer que seja o tamanho do arquivo) e grava só as colunas usadas, com a semana e as datas
+# já como inteiros. Os filtros por autor, projeto, status e tags e
+# as contagens por semana viram consultas SQL que leem só as colunas necessárias e devolvem apenas
+# as séries agregadas; a tabela inteira nunca é carregada no pandas.
+# Arquivos .duckdb usam o DuckDB (consultas vetorizadas em várias threads, se instalado); os demais
+# (.sqlite, .db) usam o SQLite.
+#
+# Uso: python banco.py --origem dados_consulta.xlsx --banco issues.duckdb
+#      BANCO_CONSULTA=issues.duckdb streamlit run main15.py
+
+TABELA = 'issues'
+COLUNAS_BANCO = [
+    ('projeto', 'VARCHAR'),
+    ('autor', 'VARCHAR'),
+    ('status', 'VARCHAR'),
+    ('tags', 'VARCHAR'),
+    ('mensagem', 'VARCHAR'),
+    ('semana', 'INTEGER'),
+    ('criacao_us', 'BIGINT'),
+    ('fechamento_us', 'BIGINT'),
+]
+COLUNAS_IMPORTACAO = ingestao.COLUNAS_PREVISAO + [indices.COLUNA_TAGS, mensagens.COLUNA_MENSAGEM]
+# Coluna do banco para cada filtro
+COLUNAS_FILTRO = {previsao.COLUNA_AUTOR: 'autor', previsao.COLUNA_PROJETO: 'projeto', 'status': 'status'}
+
+
+# Motor do arquivo de banco: DuckDB para .duckdb, SQLite para os demais
+def motor_do_arquivo(caminho):
+    return 'duckdb' if caminho.lower().endswith('.duckdb') else 'sqlite'
+
+
+class BancoIssues:
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.motor = motor_do_arquivo(caminho)
+        if self.motor == 'duckdb' and duckdb is None:
+            raise ImportError("O banco .duckdb precisa do pacote duckdb (pip install duckdb); use um arquivo .sqlite")
+        self._conexao_duckdb = None
+        self._trava = threading.Lock()
+
+    # Cursor para uma consulta: no SQLite uma conexão por consulta (as sessões rodam em threads
+    # diferentes); no DuckDB um cursor de uma conexão compartilhada somente leitura
+    def _cursor(self):
+        if self.motor == 'sqlite':
+            return sqlite3.connect(self.caminho)
+        with self._trava:
+            if self._conexao_duckdb is None:
+                self._conexao_duckdb = duckdb.connect(self.caminho, read_only=True)
+            return self._conexao_duckdb.cursor()
+
+    def consultar(self, sql, parametros=()):
+        cursor = self._cursor()
+        try:
+            return cursor.execute(sql, list(parametros)).fetchall()
+        finally:
+            cursor.close()
+
+    # Importa as exportações da origem (arquivo, diretório ou glob), lidas e gravadas em lotes de
+    # tamanho_lote linhas. Grava num arquivo temporário que depois substitui o banco: um painel com
+    # o banco aberto (o DuckDB trava o arquivo) continua lendo o antigo até reabrir
+    def importar(self, origem, tamanho_lote=50_000):
+        self.fechar()
+        temporario = f"{self.caminho}.importando"
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        if self.motor == 'duckdb':
+            conexao = duckdb.connect(temporario)
+        else:
+            conexao = sqlite3.connect(temporario)
+        try:
+            conexao.execute(f"DROP TABLE IF EXISTS {TABELA}")
+            conexao.execute(f"CREATE TABLE {TABELA} ({', '.join(f'{nome} {tipo}' for nome, tipo in COLUNAS_BANCO)})")
+            linhas = 0
+            for lote in ingestao.ler_exportacoes_em_lotes(origem, tamanho_lote, COLUNAS_IMPORTACAO):
+                lote = _lote_para_banco(lote)
+                if self.motor == 'duckdb':
+                    conexao.register('lote', lote)
+                    conexao.execute(f"INSERT INTO {TABELA} SELECT * FROM lote")
+                    conexao.unregister('lote')
+                else:
+                    valores = [lote[nome].astype(object).where(lote[nome].notna(), None).tolist() for nome, _ in COLUNAS_BANCO]
+                    conexao.executemany(f"INSERT INTO {TABELA} VALUES ({', '.join('?' * len(COLUNAS_BANCO))})", zip(*valores))
+                linhas += len(lote)
+            if self.motor == 'sqlite':
+                # O SQLite lê linha a linha: índices nos filtros mais usados
+                conexao.execute(f"CREATE INDEX IF NOT EXISTS {TABELA}_autor ON {TABELA} (autor, status)")
+                conexao.execute(f"CREATE INDEX IF NOT EXISTS {TABELA}_semana ON {TABELA} (semana)")
+                conexao.execute(f"CREATE INDEX IF NOT EXISTS {TABELA}_criacao ON {TABELA} (criacao_us)")
+            conexao.commit()
+        except BaseException:
+            conexao.close()
+            os.remove(temporario)
+            raise
+        conexao.close()
+        os.replace(temporario, self.caminho)
+        return linhas
+
+    def fechar(self):
+        with self._trava:
+            if self._conexao_duckdb is not None:
+                self._conexao_duckdb.close()
+                self._conexao_duckdb = None
+
+    # Semanas do histórico completo (da primeira à última semana de criação), limitadas ao periodo
+    # (primeiro dia, último dia), como indices.IndiceTempo.semanas
+    def semanas_do_historico(self, periodo=None):
+        inicio, fim = self.consultar(f"SELECT MIN(semana), MAX(semana) FROM {TABELA}")[0]
+        if inicio is None:
+            return pd.PeriodIndex([], freq='W')
+        if periodo is not None:
+            semanas_periodo = dados.ordinais_periodo(np.array([pd.Timestamp(data) for data in periodo], dtype='datetime64[ns]'), 'W')
+            inicio, fim = max(inicio, int(semanas_periodo[0])), min(fim, int(semanas_periodo[1]))
+        return pd.period_range(pd.Period(ordinal=inicio, freq='W'), pd.Period(ordinal=fim, freq='W'), freq='W')
+
+    # Semanas do periodo (dias cobertos / 7), como indices.IndiceTempo.semanas_cobertas
+    def semanas_cobertas(self, periodo=None):
+        return indices.semanas_cobertas(self.limites(), periodo)
+
+    # Primeira e última data de criação
+    def limites(self):
+        inicio, fim = self.consultar(f"SELECT MIN(criacao_us), MAX(criacao_us) FROM {TABELA}")[0]
+        if inicio is None:
+            return None, None
+        return pd.Timestamp(inicio, unit='us'), pd.Timestamp(fim, unit='us')
+
+    # Valores distintos de uma coluna (autor, projeto, status); para 'tags', cada tag separada
+    def valores(self, coluna):
+        if coluna == indices.COLUNA_TAGS:
+            combinacoes = self.consultar(f"SELECT DISTINCT tags FROM {TABELA} WHERE tags IS NOT NULL")
+            return sorted({tag for (combinacao,) in combinacoes for tag in combinacao.split(',') if tag})
+        nome = COLUNAS_FILTRO[coluna]
+        return [valor for (valor,) in self.consultar(f"SELECT DISTINCT {nome} FROM {TABELA} WHERE {nome} IS NOT NULL ORDER BY {nome}")]
+
+    # Totais e médias semanais de abertas e fechadas da seleção (mesma saída de previsao.combinar_taxas).
+    # Com periodo, as médias são só das issues criadas no periodo; os totais são sempre do histórico completo
+    def taxas(self, autores=None, projetos=None, tags=(), modo_tags='qualquer', periodo=None):
+        abertas, fechadas = self._contar_status(autores, projetos, tags, modo_tags)
+        abertas_janela, fechadas_janela = (abertas, fechadas) if periodo is None else self._contar_status(autores, projetos, tags, modo_tags, periodo)
+        num_semanas = self.semanas_cobertas(periodo)
+        return pd.Series({
+            'issues_abertas': int(abertas),
+            'issues_fechadas': int(fechadas),
+            'media_abertos_por_semana': abertas_janela / num_semanas,
+            'media_fechados_por_semana': fechadas_janela / num_semanas,
+        })
+
+    def _contar_status(self, autores, projetos, tags, modo_tags, periodo=None):
+        filtro, parametros = _filtros(autores, projetos, tags, modo_tags, periodo)
+        return self.consultar(
+            f"SELECT COALESCE(SUM(CASE WHEN status = ? THEN 1 ELSE 0 END), 0), COALESCE(SUM(CASE WHEN status = ? THEN 1 ELSE 0 END), 0) "
+            f"FROM {TABELA} WHERE {filtro}", [previsao.STATUS_ABERTO, previsao.STATUS_FECHADO] + parametros)[0]
+
+    # Issues abertas e fechadas por semana de criação no histórico completo (ou no periodo), com zero
+    # nas semanas sem issues
+    def contagens_semanais(self, autores=None, projetos=None, tags=(), modo_tags='qualquer', periodo=None):
+        filtro, parametros = _filtros(autores, projetos, tags, modo_tags, periodo)
+        linhas = self.consultar(
+            f"SELECT semana, SUM(CASE WHEN status = ? THEN 1 ELSE 0 END), SUM(CASE WHEN status = ? THEN 1 ELSE 0 END) "
+            f"FROM {TABELA} WHERE {filtro} GROUP BY semana", [previsao.STATUS_ABERTO, previsao.STATUS_FECHADO] + parametros)
+        semanas = self.semanas_do_historico(periodo)
+        contagem = pd.DataFrame(linhas, columns=['semana', 'abertas', 'fechadas']).set_index('semana')
+        return contagem.reindex(semanas.asi8, fill_value=0).set_axis(semanas).astype(np.int64)
+
+    # Média semanal de novas issues abertas por regra: as mensagens são contadas no banco e só os
+    # textos distintos passam por mensagens.extrair_regra
+    def medias_por_regra(self, autores=None, projetos=None, tags=(), modo_tags='qualquer', periodo=None):
+        filtro, parametros = _filtros(autores, projetos, tags, modo_tags, periodo)
+        linhas = self.consultar(f"SELECT mensagem, COUNT(*) FROM {TABELA} WHERE status = ? AND {filtro} GROUP BY mensagem",
+                                [previsao.STATUS_ABERTO] + parametros)
+        contagem = pd.Series([total for _, total in linhas], index=[mensagens.extrair_regra(mensagem) for mensagem, _ in linhas], dtype=np.float64)
+        medias = contagem.groupby(level=0).sum() / self.semanas_cobertas(periodo)
+        return medias.rename_axis(mensagens.COLUNA_REGRA).sort_values(ascending=False)
+
+    # Média semanal de issues criadas na seleção, com qualquer status (chegada de novas issues no
+    # modelo de sobrevivência, como pipeline.media_criadas_por_semana)
+    def media_criadas_por_semana(self, autores=None, projetos=None, tags=(), modo_tags='qualquer', periodo=None):
+        filtro, parametros = _filtros(autores, projetos, tags, modo_tags, periodo)
+        total = self.consultar(f"SELECT COUNT(*) FROM {TABELA} WHERE criacao_us IS NOT NULL AND {filtro}", parametros)[0][0]
+        return total / self.semanas_cobertas(periodo)
+
+    # Datas de criação das issues da seleção ainda abertas para o modelo de sobrevivência
+    # (indices.abertas_vida: tudo menos CLOSED com data de fechamento)
+    def criacao_abertas(self, autores=None, projetos=None, tags=(), modo_tags='qualquer'):
+        filtro, parametros = _filtros(autores, projetos, tags, modo_tags)
+        linhas = self.consultar(f"SELECT criacao_us FROM {TABELA} WHERE criacao_us IS NOT NULL "
+                                f"AND (status IS NULL OR status <> ? OR fechamento_us IS NULL) AND {filtro}",
+                                [previsao.STATUS_FECHADO] + parametros)
+        return np.array([criacao for (criacao,) in linhas], dtype=np.int64).astype('datetime64[us]')
+
+    # Índice de tempo de vida de todas as issues, montado lendo o banco em lotes
+    def indice_vida(self, tamanho_lote=200_000):
+        indice_vida = indices.IndiceVida()
+        cursor = self._cursor()
+        try:
+            resultado = cursor.execute(f"SELECT status, criacao_us, fechamento_us FROM {TABELA} WHERE criacao_us IS NOT NULL")
+            while True:
+                linhas = resultado.fetchmany(tamanho_lote)
+                if not linhas:
+                    break
+                status, criacao, fechamento = zip(*linhas)
+                indice_vida.adicionar(pd.DataFrame({
+                    'status': status,
+                    'issue_creation_date': pd.to_datetime(np.array(criacao, dtype=np.int64), unit='us'),
+                    'issue_close_date': pd.to_datetime(pd.array(fechamento, dtype='Int64'), unit='us'),
+                }))
+        finally:
+            cursor.close()
+        return indice_vida
+
+
+# Converte um lote lido das exportações para as colunas do banco
+def _lote_para_banco(lote):
+    criacao = lote['issue_creation_date'].to_numpy(dtype='datetime64[us]')
+    fechamento = lote['issue_close_date'].to_numpy(dtype='datetime64[us]')
+    tags = lote[indices.COLUNA_TAGS].astype(object)
+    return pd.DataFrame({
+        'projeto': lote[previsao.COLUNA_PROJETO].astype(object),
+        'autor': lote[previsao.COLUNA_AUTOR].astype(object),
+        'status': lote['status'].astype(object),
+        # Tags sem espaços, para o filtro por ',tag,' no SQL
+        'tags': tags.where(tags.isna(), tags.astype(str).str.strip().str.replace(r'\s*,\s*', ',', regex=True)),
+        'mensagem': lote[mensagens.COLUNA_MENSAGEM].astype(object),
+        'semana': _inteiros(dados.ordinais_periodo(criacao, 'W'), np.isnat(criacao)),
+        'criacao_us': _inteiros(criacao.astype(np.int64), np.isnat(criacao)),
+        'fechamento_us': _inteiros(fechamento.astype(np.int64), np.isnat(fechamento)),
+    })
+
+
+# Inteiros com NULL nas posições marcadas em nulos
+def _inteiros(valores, nulos):
+    return pd.arrays.IntegerArray(valores.astype(np.int64), nulos)
+
+
+# Cláusula WHERE e parâmetros dos filtros (None = sem filtro; lista vazia = nenhuma issue).
+# periodo = (primeiro dia, último dia) de criação, inclusive
+def _filtros(autores=None, projetos=None, tags=(), modo_tags='qualquer', periodo=None):
+    condicoes, parametros = ['1 = 1'], []
+    for coluna, valores in (('autor', autores), ('projeto', projetos)):
+        if valores is None:
+            continue
+        valores = list(valores)
+        condicoes.append(f"{coluna} IN ({', '.join('?' * len(valores))})" if valores else '1 = 0')
+        parametros.extend(valores)
+    if tags:
+        juncao = ' AND ' if modo_tags == 'todas' else ' OR '
+        condicoes.append('(' + juncao.join(["(',' || tags || ',') LIKE ? ESCAPE '\\'"] * len(tags)) + ')')
+        parametros.extend(f"%,{_escapar_like(tag)},%" for tag in tags)
+    if periodo is not None:
+        inicio, fim = (pd.Timestamp(data).normalize() for data in periodo)
+        condicoes.append('criacao_us >= ? AND criacao_us < ?')
+        parametros.extend([inicio.value // 1000, (fim + pd.Timedelta(days=1)).value // 1000])
+    return ' AND '.join(condicoes), parametros
+
+
+# Escapa os curingas do LIKE ('%' e '_') num valor literal
+def _escapar_like(valor):
+    return valor.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Importa as exportações do SonarQube para um banco embutido (DuckDB ou SQLite)")
+    parser.add_argument('--origem', default="dados_consulta.xlsx", help="arquivo, diretório ou padrão glob das exportações")
+    parser.add_argument('--banco', default="issues.duckdb" if duckdb is not None else "issues.sqlite", help="arquivo do banco (.duckdb ou .sqlite)")
+    parser.add_argument('--tamanho-lote', type=int, default=50_000, help="linhas por lote na importação")
+    argumentos = parser.parse_args()
+    inicio = time.perf_counter()
+    linhas = BancoIssues(argumentos.banco).importar(argumentos.origem, argumentos.tamanho_lote)
+    print(f"{linhas} issues importadas em {argumentos.banco} ({time.perf_counter() - inicio:.1f}s)")
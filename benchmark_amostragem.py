@@ -0,0 +1,45 @@
+import time
+
+import numpy as np
+
+import ingestao
+import previsao
+
+# Compara os métodos de amostragem da simulação do backlog.
+# Para cada método, repete a simulação várias vezes com o mesmo número de caminhos e mede a
+# variância das estimativas. O ganho de tamanho efetivo de amostra (ESS) é a variância da
+# amostragem aleatória dividida pela variância do método: um ganho de 10 significa que o
+# método precisa de 10 vezes menos caminhos para a mesma precisão.
+
+file_path = "dados_consulta.xlsx"
+num_simulacoes = 1000
+num_semanas = 12
+repeticoes = 200
+
+# Taxas do histórico completo (todos os autores), como nos apps; a planilha é lida em lotes e só as
+# contagens ficam em memória
+lotes = ingestao.ler_exportacoes_em_lotes(file_path)
+taxas = previsao.calcular_taxas_em_lotes(lotes, [previsao.COLUNA_AUTOR])[previsao.COLUNA_AUTOR].sum()
+issues_abertas = int(taxas['issues_abertas'])
+media_abertos_por_semana = taxas['media_abertos_por_semana']
+media_fechados_por_semana = taxas['media_fechados_por_semana']
+
+rng = np.random.default_rng(42)
+resultados = {}
+for metodo in previsao.METODOS_AMOSTRAGEM:
+    estimativas_backlog = []
+    estimativas_abertas = []
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        projecao = previsao.simular_backlog(issues_abertas, media_abertos_por_semana, media_fechados_por_semana,
+                                            num_simulacoes, num_semanas, rng=rng, amostragem=metodo)
+        estimativas_backlog.append(projecao['backlog_medio'].iloc[-1])
+        estimativas_abertas.append(projecao['novas_abertas'].sum())
+    tempo = (time.perf_counter() - inicio) / repeticoes
+    resultados[metodo] = (np.var(estimativas_backlog), np.var(estimativas_abertas), tempo)
+
+var_backlog_base, var_abertas_base, tempo_base = resultados['aleatoria']
+print(f"{num_simulacoes} simulações x {num_semanas} semanas, {repeticoes} repetições por método")
+print(f"{'método':<14}{'ESS backlog final':>20}{'ESS total abertas':>20}{'tempo (ms)':>12}")
+for metodo, (var_backlog, var_abertas, tempo) in resultados.items():
+    print(f"{metodo:<14}{var_backlog_base / var_backlog:>20.1f}{var_abertas_base / var_abertas:>20.1f}{tempo * 1000:>12.1f}")
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+# Teste de carga do servidor_api: abre várias conexões simultâneas (keep-alive), cada uma fazendo
+# pedidos de previsão com combinações aleatórias de autores e horizontes, e mostra a vazão e os
+# percentis de latência.
+#
+# Uso: python carga_api.py --clientes 50 --pedidos 20 --porta 8765
+
+
+async def pedir(leitor, escritor, caminho):
+    escritor.write(f"GET {caminho} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('latin-1'))
+    await escritor.drain()
+    status = (await leitor.readline()).split()[1]
+    tamanho = 0
+    while True:
+        cabecalho = await leitor.readline()
+        if cabecalho == b'\r\n':
+            break
+        nome, _, valor = cabecalho.decode('latin-1').partition(':')
+        if nome.lower() == 'content-length':
+            tamanho = int(valor)
+    corpo = await leitor.readexactly(tamanho)
+    return int(status), corpo
+
+
+async def cliente(host, porta, autores, num_pedidos, simulacoes, latencias, falhas):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    try:
+        for _ in range(num_pedidos):
+            selecao = random.sample(autores, random.randint(1, len(autores)))
+            semanas = random.choice([4, 8, 12, 26, 52])
+            caminho = f"/previsao?autores={quote(','.join(selecao))}&semanas={semanas}&simulacoes={simulacoes}"
+            inicio = time.perf_counter()
+            status, _ = await pedir(leitor, escritor, caminho)
+            latencias.append(time.perf_counter() - inicio)
+            if status != 200:
+                falhas.append(status)
+    finally:
+        escritor.close()
+
+
+async def main(host, porta, clientes, pedidos, simulacoes):
+    leitor, escritor = await asyncio.open_connection(host, porta)
+    _, corpo = await pedir(leitor, escritor, "/autores")
+    escritor.close()
+    autores = json.loads(corpo)
+
+    latencias, falhas = [], []
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(host, porta, autores, pedidos, simulacoes, latencias, falhas) for _ in range(clientes)))
+    duracao = time.perf_counter() - inicio
+
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) * 1000
+    print(f"{len(latencias)} pedidos de {clientes} clientes em {duracao:.2f}s ({len(latencias) / duracao:.1f} pedidos/s), {len(falhas)} falhas")
+    print(f"latência p50 {p50:.1f} ms, p95 {p95:.1f} ms, p99 {p99:.1f} ms, máx {max(latencias) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga do serviço de projeção")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--clientes', type=int, default=50)
+    parser.add_argument('--pedidos', type=int, default=20, help="pedidos por cliente")
+    parser.add_argument('--simulacoes', type=int, default=1000)
+    argumentos = parser.parse_args()
+    asyncio.run(main(argumentos.host, argumentos.porta, argumentos.clientes, argumentos.pedidos, argumentos.simulacoes))
@@ -0,0 +1,158 @@
+import argparse
+import datetime
+import os
+import random
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+# Teste de carga dos dashboards Streamlit (main14.py, main15.py, ...).
+# Gera uma exportação sintética do tamanho pedido, abre várias sessões simultâneas do app com a
+# API de testes do Streamlit (AppTest, sem navegador) e cada sessão faz uma sequência de
+# interações realistas: trocar autores no multiselect e mover os controles deslizantes.
+# Como todas as sessões rodam no mesmo processo, elas compartilham os caches do Streamlit como
+# em um servidor real. O relatório mostra percentis de latência por reexecução, vazão e a
+# memória (RSS) do processo.
+#
+# Uso: python carga_streamlit.py --app main14.py --sessoes 20 --interacoes 10 --linhas 100000
+
+STATUS_SINTETICOS = ['OPEN', 'CLOSED', 'REOPENED', 'TO_REVIEW']
+TAGS_SINTETICAS = ['accessibility', 'accessibility,wcag2-a', 'unused', 'es2015,type-dependent,unused', 'cwe', 'clumsy']
+MENSAGENS_SINTETICAS = ["Remove this unused import of '{}'.", "A página contém palavras que não são em português: {}",
+                        "Remove this commented out code.", "Unexpected empty method '{}'."]
+ROTULO_AUTORES = "Selecione os Autores"
+EPOCA = datetime.datetime(1970, 1, 1)
+
+
+# Gera um .csv no formato da exportação "Resultado da consulta" do SonarQube
+def gerar_exportacao_sintetica(caminho, num_linhas, num_autores=10, num_projetos=3, num_semanas=52, semente=0):
+    rng = np.random.default_rng(semente)
+    criacao = pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.uniform(0, 7 * num_semanas, num_linhas), unit='D')
+    status = rng.choice(STATUS_SINTETICOS, num_linhas, p=[0.6, 0.3, 0.07, 0.03])
+    fechamento = criacao + pd.to_timedelta(rng.exponential(30, num_linhas), unit='D')
+    fechamento = pd.Series(fechamento).where(status == 'CLOSED')
+    palavras = np.array(['name', 'Input', 'HttpClient', 'refresh', 'the', 'key'])
+    mensagens = [modelo.format(palavra) for modelo, palavra in
+                 zip(rng.choice(MENSAGENS_SINTETICAS, num_linhas), rng.choice(palavras, num_linhas))]
+    pd.DataFrame({
+        'Projects - Project UUID__kee': rng.choice([f'projeto{i}' for i in range(num_projetos)], num_linhas),
+        'message': mensagens,
+        'author_login': rng.choice([f'autor{i}' for i in range(num_autores)], num_linhas),
+        'status': status,
+        'issue_creation_date': criacao,
+        'issue_close_date': fechamento,
+        'tags': rng.choice(TAGS_SINTETICAS, num_linhas),
+    }).to_csv(caminho, index=False)
+
+
+# Memória residente atual do processo, em MB (Linux: /proc/self/statm)
+def rss_atual_mb():
+    try:
+        with open('/proc/self/statm') as arquivo:
+            return int(arquivo.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# Converte uma posição do controle deslizante (unidades do Streamlit: números, ou microssegundos
+# desde a época para datas) no tipo do valor atual do controle
+def valor_do_slider(exemplo, posicao):
+    if isinstance(exemplo, datetime.datetime):
+        return EPOCA + datetime.timedelta(microseconds=int(posicao))
+    if isinstance(exemplo, datetime.date):
+        return (EPOCA + datetime.timedelta(microseconds=int(posicao))).date()
+    return type(exemplo)(posicao)
+
+
+# Uma interação aleatória: nova seleção de autores ou novo valor em um controle deslizante.
+# O multiselect dos autores é achado pelo rótulo (main15.py tem outros multiselects); controles
+# de intervalo recebem um par (início, fim)
+def interagir(app, rng):
+    autores = [multiselect for multiselect in app.multiselect if multiselect.label == ROTULO_AUTORES]
+    acoes = []
+    if autores:
+        acoes.append('autores')
+    if app.slider:
+        acoes.append('slider')
+    acao = rng.choice(acoes)
+    if acao == 'autores':
+        opcoes = list(autores[0].options)
+        autores[0].set_value(rng.sample(opcoes, rng.randint(1, len(opcoes))))
+    else:
+        slider = rng.choice(list(app.slider))
+        passo = slider.proto.step or 1
+        posicoes = np.minimum(np.arange(slider.proto.min, slider.proto.max + passo / 2, passo), slider.proto.max)
+        if isinstance(slider.value, tuple):
+            inicio, fim = sorted(rng.choices(range(len(posicoes)), k=2))
+            slider.set_value((valor_do_slider(slider.value[0], posicoes[inicio]), valor_do_slider(slider.value[1], posicoes[fim])))
+        else:
+            slider.set_value(valor_do_slider(slider.value, rng.choice(list(posicoes))))
+
+
+# Uma sessão: abre o app e faz as interações, medindo cada reexecução
+def sessao(app_path, num_interacoes, timeout, semente, latencias, falhas):
+    rng = random.Random(semente)
+    app = AppTest.from_file(app_path, default_timeout=timeout)
+    for i in range(num_interacoes + 1):
+        if i > 0:
+            interagir(app, rng)
+        inicio = time.perf_counter()
+        app.run()
+        latencias.append(time.perf_counter() - inicio)
+        if app.exception:
+            falhas.append(app.exception[0].message)
+
+
+def main(app, sessoes, interacoes, linhas, autores, timeout):
+    with tempfile.TemporaryDirectory() as pasta:
+        exportacao = os.path.join(pasta, 'exportacao_sintetica.csv')
+        inicio = time.perf_counter()
+        gerar_exportacao_sintetica(exportacao, linhas, autores)
+        print(f"Exportação sintética: {linhas} linhas, {autores} autores ({time.perf_counter() - inicio:.1f}s)")
+        os.environ['DADOS_CONSULTA'] = exportacao
+
+        rss_inicial = rss_atual_mb()
+        pico = [rss_inicial]
+        terminou = threading.Event()
+
+        def amostrar_memoria():
+            while not terminou.wait(0.1):
+                pico[0] = max(pico[0], rss_atual_mb())
+
+        amostrador = threading.Thread(target=amostrar_memoria, daemon=True)
+        amostrador.start()
+
+        latencias, falhas = [], []
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=sessoes) as pool:
+            tarefas = [pool.submit(sessao, app, interacoes, timeout, i, latencias, falhas) for i in range(sessoes)]
+            for tarefa in tarefas:
+                tarefa.result()
+        duracao = time.perf_counter() - inicio
+        terminou.set()
+
+    p50, p95, p99 = np.percentile(latencias, [50, 95, 99]) * 1000
+    print(f"{app}: {sessoes} sessões x {interacoes} interações = {len(latencias)} reexecuções em {duracao:.1f}s "
+          f"({len(latencias) / duracao:.1f} reexecuções/s), {len(falhas)} falhas")
+    print(f"latência por reexecução: p50 {p50:.0f} ms, p95 {p95:.0f} ms, p99 {p99:.0f} ms, máx {max(latencias) * 1000:.0f} ms")
+    print(f"memória (RSS): inicial {rss_inicial:.0f} MB, pico {pico[0]:.0f} MB, final {rss_atual_mb():.0f} MB")
+    for falha in sorted(set(falhas)):
+        print(f"falha: {falha}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Teste de carga dos dashboards Streamlit")
+    parser.add_argument('--app', default='main14.py')
+    parser.add_argument('--sessoes', type=int, default=20, help="sessões simultâneas")
+    parser.add_argument('--interacoes', type=int, default=10, help="interações por sessão")
+    parser.add_argument('--linhas', type=int, default=100_000, help="linhas da exportação sintética")
+    parser.add_argument('--autores', type=int, default=10, help="autores na exportação sintética")
+    parser.add_argument('--timeout', type=float, default=120, help="tempo máximo de cada reexecução (s)")
+    argumentos = parser.parse_args()
+    main(argumentos.app, argumentos.sessoes, argumentos.interacoes, argumentos.linhas, argumentos.autores, argumentos.timeout)
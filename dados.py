@@ -0,0 +1,165 @@
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Períodos dos histogramas: dia, semana (terminando no domingo, como pd.Period('W')) e mês
+FREQUENCIAS = ('D', 'W', 'M')
+# Coluna da tabela com o ordinal do período de criação de cada issue
+COLUNAS_PERIODO = {'D': 'dia', 'W': 'semana', 'M': 'mes'}
+# Ordinal usado para datas ausentes
+SEM_PERIODO = np.iinfo(np.int32).min
+
+
+# Converte datas em ordinais inteiros de período, iguais a pd.Period(data, freq).ordinal, sem criar
+# objetos Period: dias desde 1970-01-01; semanas a partir do dia (1970-01-01 é uma quinta-feira);
+# meses pelo datetime64[M]. Datas ausentes (NaT) viram -2**31.
+def ordinais_periodo(datas, freq='W'):
+    datas = np.asarray(datas, dtype='datetime64[ns]')
+    if freq == 'M':
+        ordinais = datas.astype('datetime64[M]').astype(np.int64)
+    else:
+        ordinais = datas.astype('datetime64[D]').astype(np.int64)
+        if freq == 'W':
+            ordinais = (ordinais + 3) // 7 + 1
+        elif freq != 'D':
+            raise ValueError(f"Frequência desconhecida: {freq}")
+    ordinais[np.isnat(datas)] = SEM_PERIODO
+    return ordinais.astype(np.int32)
+
+
+# Código combinado de (status, período) por linha: status * num_periodos + (período - inicio).
+# Linhas sem data ou sem status ficam no código extra num_status * num_periodos, descartado na contagem.
+# Retorna (códigos, inicio, num_periodos).
+def combinar_status_periodo(ordinais, codigos_status, num_status):
+    validas = (ordinais != SEM_PERIODO) & (codigos_status >= 0)
+    inicio, fim = (int(ordinais[validas].min()), int(ordinais[validas].max())) if validas.any() else (0, -1)
+    num_periodos = fim - inicio + 1
+    combinados = np.full(len(ordinais), num_status * num_periodos, dtype=np.int32)
+    combinados[validas] = codigos_status[validas].astype(np.int32) * num_periodos + (ordinais[validas] - inicio)
+    return combinados, inicio, num_periodos
+
+
+# Histograma de issues por (status, período) em uma única passada: um np.bincount sobre os códigos
+# combinados conta todos os status de uma vez, com zero nos períodos sem issues.
+# Retorna uma matriz (num_status, num_periodos); mascara restringe as linhas. A máscara entra como
+# peso do bincount (0 ou 1), o que evita copiar os códigos das linhas selecionadas.
+def histograma_por_status(combinados, num_status, num_periodos, mascara=None):
+    contagem = np.bincount(combinados, weights=mascara, minlength=num_status * num_periodos + 1)
+    if mascara is not None:
+        contagem = contagem.astype(np.int64)
+    return contagem[:-1].reshape(num_status, num_periodos)
+
+
+# Tabela de issues compartilhada, somente leitura, carregada uma vez por processo do servidor.
+# Cada coluna é guardada como array NumPy protegido contra escrita: colunas 'category' viram
+# códigos inteiros + lista de categorias, datas viram datetime64. O dia, a semana e o mês de
+# criação já vêm calculados (ordinais inteiros), então as sessões não precisam criar colunas novas
+# nem copiar a tabela para filtrar: os filtros são máscaras e as contagens usam os arrays compartilhados.
+class TabelaIssues:
+    def __init__(self, df):
+        self.num_linhas = len(df)
+        self._colunas = {}
+        self._categorias = {}
+        for coluna in df.columns:
+            serie = df[coluna]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                self._categorias[coluna] = list(serie.cat.categories)
+                self._colunas[coluna] = _somente_leitura(serie.cat.codes.to_numpy())
+            else:
+                self._colunas[coluna] = _somente_leitura(serie.to_numpy())
+        # Dia, semana e mês de criação como ordinais inteiros (pd.Period(..., freq).ordinal)
+        # e, por frequência, o código combinado (status, período) usado nos histogramas
+        self._histogramas = {}
+        for freq, coluna in COLUNAS_PERIODO.items():
+            self._colunas[coluna] = _somente_leitura(ordinais_periodo(df['issue_creation_date'], freq))
+            combinados, inicio, num_periodos = combinar_status_periodo(
+                self._colunas[coluna], self._colunas['status'], len(self._categorias['status']))
+            self._histogramas[freq] = (_somente_leitura(combinados), inicio, num_periodos)
+
+    @property
+    def colunas(self):
+        return list(self._colunas)
+
+    # Array somente leitura da coluna (para colunas 'category', os códigos)
+    def coluna(self, nome):
+        return self._colunas[nome]
+
+    def categorias(self, nome):
+        return self._categorias[nome]
+
+    # Máscara das linhas cujo valor da coluna está entre os valores pedidos
+    def mascara(self, coluna, valores):
+        if coluna in self._categorias:
+            codigos = [i for i, categoria in enumerate(self._categorias[coluna]) if categoria in set(valores)]
+            return np.isin(self._colunas[coluna], codigos)
+        return np.isin(self._colunas[coluna], list(valores))
+
+    # Contagem de issues por período de criação e status (colunas = status), do início ao fim do
+    # histórico, com zero nos períodos sem issues. Todos os status saem de um único histograma;
+    # mascara restringe as linhas (ex.: autores selecionados).
+    # Com fatia = (inicio, fim) (tabela ordenada pela criação, indices.IndiceTempo), só as linhas da
+    # fatia são contadas, sem cópia (a mascara tem então o tamanho da fatia), e o resultado vai do
+    # primeiro ao último período da fatia
+    def contar_por_periodo(self, freq='W', mascara=None, fatia=None):
+        combinados, inicio, num_periodos = self._histogramas[freq]
+        status = self._categorias['status']
+        primeiro, ultimo = 0, num_periodos
+        if fatia is not None:
+            combinados = combinados[fatia[0]:fatia[1]]
+            if fatia[1] > fatia[0]:
+                ordinais = self._colunas[COLUNAS_PERIODO[freq]]
+                primeiro, ultimo = int(ordinais[fatia[0]]) - inicio, int(ordinais[fatia[1] - 1]) - inicio + 1
+            else:
+                primeiro, ultimo = 0, 0
+        contagem = histograma_por_status(combinados, len(status), num_periodos, mascara)[:, primeiro:ultimo]
+        periodos = pd.period_range(pd.Period(ordinal=inicio + primeiro, freq=freq), periods=ultimo - primeiro, freq=freq)
+        return pd.DataFrame(contagem.T, index=periodos, columns=pd.Index(status, name='status'))
+
+    @property
+    def nbytes(self):
+        return (sum(array.nbytes for array in self._colunas.values())
+                + sum(combinados.nbytes for combinados, _, _ in self._histogramas.values()))
+
+
+def _somente_leitura(array):
+    array = np.ascontiguousarray(array)
+    array.setflags(write=False)
+    return array
+
+
+# Registro de memória por sessão do Streamlit (compartilhado pelo processo do servidor)
+_sessoes = {}
+_trava_sessoes = threading.Lock()
+
+
+# Memória aproximada de um objeto: arrays e DataFrames pelo tamanho dos dados
+def contar_bytes(objeto):
+    if isinstance(objeto, np.ndarray):
+        return objeto.nbytes
+    if isinstance(objeto, (pd.DataFrame, pd.Series)):
+        return int(np.sum(objeto.memory_usage(deep=True)))
+    if isinstance(objeto, dict):
+        return sum(contar_bytes(valor) for valor in objeto.values())
+    if isinstance(objeto, (list, tuple)):
+        return sum(contar_bytes(valor) for valor in objeto)
+    return sys.getsizeof(objeto)
+
+
+# Registra os bytes que uma sessão mantém além da tabela compartilhada
+def registrar_sessao(id_sessao, objetos):
+    with _trava_sessoes:
+        _sessoes[id_sessao] = (contar_bytes(objetos), time.time())
+
+
+# Memória por sessão vista nos últimos 'janela_segundos' (uma linha por sessão)
+def memoria_por_sessao(janela_segundos=600):
+    limite = time.time() - janela_segundos
+    with _trava_sessoes:
+        for id_sessao in [i for i, (_, visto) in _sessoes.items() if visto < limite]:
+            del _sessoes[id_sessao]
+        linhas = {id_sessao: bytes_sessao for id_sessao, (bytes_sessao, _) in _sessoes.items()}
+    return pd.Series(linhas, name='bytes', dtype=np.int64).rename_axis('sessao')
+
@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+import previsao
+
+# Colunas indexadas por valor e coluna de tags (listas separadas por vírgula, ex.: "accessibility,wcag2-a")
+COLUNAS_INDICE = (previsao.COLUNA_PROJETO, previsao.COLUNA_AUTOR, 'status')
+COLUNA_TAGS = 'tags'
+
+
+# Índice invertido valor -> bitmap de linhas, montado uma vez na ingestão.
+# Cada bitmap é um array de bits compactado (np.packbits, 1 bit por linha), então filtros por
+# tag, status, autor e projeto viram operações E/OU bit a bit, sem varrer textos a cada execução.
+# As colunas precisam ser 'category' (como em ingestao): os bitmaps são feitos a partir dos
+# códigos das categorias e as listas de tags só são separadas uma vez por valor distinto.
+class IndiceBitmap:
+    def __init__(self, df, colunas=COLUNAS_INDICE, coluna_tags=COLUNA_TAGS):
+        self.num_linhas = len(df)
+        self.bitmaps = {}
+        for coluna in colunas:
+            codigos = df[coluna].cat.codes.to_numpy()
+            self.bitmaps[coluna] = {
+                valor: np.packbits(codigos == codigo)
+                for codigo, valor in enumerate(df[coluna].cat.categories)
+            }
+        if coluna_tags in df.columns:
+            self.bitmaps[coluna_tags] = self._indexar_tags(df[coluna_tags])
+
+    def _indexar_tags(self, serie):
+        # Para cada tag, os códigos das combinações de tags que a contêm
+        codigos_por_tag = {}
+        for codigo, combinacao in enumerate(serie.cat.categories):
+            for tag in str(combinacao).split(','):
+                if tag:
+                    codigos_por_tag.setdefault(tag.strip(), []).append(codigo)
+        codigos = serie.cat.codes.to_numpy()
+        return {tag: np.packbits(np.isin(codigos, lista)) for tag, lista in sorted(codigos_por_tag.items())}
+
+    # Valores distintos indexados de uma coluna
+    def valores(self, coluna):
+        return list(self.bitmaps[coluna])
+
+    # Bitmap com todas as linhas
+    def todas(self):
+        return np.packbits(np.ones(self.num_linhas, dtype=bool))
+
+    # Bitmap das linhas com os valores pedidos, combinados com OU ('qualquer') ou E ('todas')
+    def bitmap(self, coluna, valores, modo='qualquer'):
+        vazio = np.zeros((self.num_linhas + 7) // 8, dtype=np.uint8)
+        bitmaps = [self.bitmaps[coluna].get(valor, vazio) for valor in valores]
+        if not bitmaps:
+            return self.todas() if modo == 'todas' else vazio
+        operacao = np.bitwise_and if modo == 'todas' else np.bitwise_or
+        return operacao.reduce(bitmaps)
+
+    # Converte um bitmap em máscara booleana por linha. Com fatia = (inicio, fim), só as linhas
+    # inicio..fim-1 (ex.: uma janela do IndiceTempo): apenas os bytes da janela são desempacotados
+    def mascara(self, bitmap, fatia=None):
+        if fatia is None:
+            return np.unpackbits(bitmap, count=self.num_linhas).astype(bool)
+        inicio, fim = fatia
+        primeiro_byte = inicio // 8
+        bits = np.unpackbits(bitmap[primeiro_byte:(fim + 7) // 8], count=fim - 8 * primeiro_byte)
+        return bits[inicio - 8 * primeiro_byte:].astype(bool)
+
+    # Quantidade de linhas marcadas no bitmap
+    def contar(self, bitmap):
+        return int(np.unpackbits(bitmap, count=self.num_linhas).sum())
+
+    # Linhas do DataFrame (o mesmo usado para montar o índice) marcadas no bitmap, opcionalmente
+    # só dentro da fatia (inicio, fim)
+    def selecionar(self, df, bitmap, fatia=None):
+        inicio = 0 if fatia is None else fatia[0]
+        return df.iloc[inicio + np.flatnonzero(self.mascara(bitmap, fatia))]
+
+
+# Índice de tempo sobre a tabela ordenada pela data de criação (ingestao.ordenar_por_criacao).
+# Como as linhas estão em ordem, uma janela de datas é uma fatia contígua de linhas, encontrada por
+# busca binária (np.searchsorted) em O(log n); a fatia se combina com os bitmaps do IndiceBitmap
+# (IndiceBitmap.mascara/selecionar com fatia) sem varrer nem copiar as linhas fora da janela.
+# Linhas sem data de criação ficam no fim da tabela e fora de qualquer janela.
+class IndiceTempo:
+    def __init__(self, datas_criacao):
+        datas = np.asarray(datas_criacao, dtype='datetime64[us]')
+        self.num_linhas = len(datas)
+        self.datas = datas[:len(datas) - int(np.isnat(datas).sum())]
+        if np.any(self.datas[1:] < self.datas[:-1]):
+            raise ValueError("A tabela precisa estar ordenada pela data de criação")
+
+    # Primeira e última data de criação
+    def limites(self):
+        if len(self.datas) == 0:
+            return None, None
+        return pd.Timestamp(self.datas[0]), pd.Timestamp(self.datas[-1])
+
+    # Fatia (inicio, fim) das linhas criadas no periodo = (primeiro dia, último dia), inclusive;
+    # sem periodo, todas as linhas
+    def fatia(self, periodo=None):
+        if periodo is None:
+            return 0, self.num_linhas
+        inicio, fim = _dias(periodo)
+        return (int(np.searchsorted(self.datas, inicio, side='left')),
+                int(np.searchsorted(self.datas, fim + np.timedelta64(1, 'D'), side='left')))
+
+    # Semanas do histórico (como previsao.semanas_do_historico), limitadas ao periodo
+    def semanas(self, periodo=None):
+        primeira, ultima = self.limites()
+        if primeira is None:
+            return pd.PeriodIndex([], freq='W')
+        if periodo is not None:
+            inicio, fim = _dias(periodo)
+            primeira, ultima = max(primeira, pd.Timestamp(inicio)), min(ultima, pd.Timestamp(fim))
+        return pd.period_range(primeira.to_period('W'), ultima.to_period('W'), freq='W')
+
+    # Semanas do periodo (dias cobertos / 7), base das médias semanais da janela ou do histórico
+    def semanas_cobertas(self, periodo=None):
+        return semanas_cobertas(self.limites(), periodo)
+
+
+# Número de semanas (fracionário) coberto pelo periodo: os dias do periodo entre a primeira e a
+# última data de criação (limites), inclusive, divididos por 7. Sem periodo, todos os dias entre os
+# limites, então o histórico completo e a mesma janela pedida explicitamente dão a mesma média.
+# Contar as semanas tocadas contaria semanas parciais como inteiras. Ao menos um dia.
+def semanas_cobertas(limites, periodo=None):
+    primeira, ultima = limites
+    if primeira is None:
+        return 1.0
+    inicio, fim = np.datetime64(primeira, 'D'), np.datetime64(ultima, 'D')
+    if periodo is not None:
+        inicio_periodo, fim_periodo = _dias(periodo)
+        inicio, fim = max(inicio, inicio_periodo), min(fim, fim_periodo)
+    return max(int((fim - inicio).astype(np.int64)) + 1, 1) / 7
+
+
+# Primeiro e último dia de um periodo (datas, textos ou Timestamps) como datetime64[D]
+def _dias(periodo):
+    inicio, fim = periodo
+    return np.datetime64(pd.Timestamp(inicio), 'D'), np.datetime64(pd.Timestamp(fim), 'D')
+
+
+# Issues ainda abertas para o modelo de sobrevivência: com data de criação e sem o par status CLOSED +
+# data de fechamento (OPEN, REOPENED, TO_REVIEW...). A mesma definição vale para a censura da curva
+# (IndiceVida) e para o backlog inicial (pipeline.idades_abertas, banco.BancoIssues.criacao_abertas).
+def abertas_vida(df):
+    fechadas = (df['status'] == previsao.STATUS_FECHADO).to_numpy() & df['issue_close_date'].notna().to_numpy()
+    return ~fechadas & df['issue_creation_date'].notna().to_numpy()
+
+
+# Índice de tempo de vida das issues (da criação ao fechamento), em dias.
+# Issues ainda não fechadas (abertas_vida) entram como censuradas na data de referência (a data mais
+# recente das exportações). As durações das fechadas e as datas de criação das abertas ficam em arrays
+# ordenados; a curva de sobrevivência empírica (Kaplan-Meier) sai de uma intercalação ordenada
+# + np.unique, em O(n log n).
+# adicionar() monta o índice em partes da mesma tabela (ex.: lotes lidos do banco em banco.py),
+# intercalando os valores nos arrays já ordenados. As exportações não têm a chave da issue, então uma
+# issue presente em duas partes conta duas vezes: não serve para somar exportações que se sobrepõem.
+class IndiceVida:
+    def __init__(self, df=None):
+        self.duracoes_fechadas = np.empty(0, dtype=np.float64)
+        self.criacao_abertas = np.empty(0, dtype='datetime64[us]')
+        self.data_referencia = None
+        self._curva = None
+        if df is not None:
+            self.adicionar(df)
+
+    def adicionar(self, df):
+        criacao = df['issue_creation_date']
+        fechamento = df['issue_close_date']
+        data_referencia = max(criacao.max(), fechamento.max()) if fechamento.notna().any() else criacao.max()
+        if self.data_referencia is None or data_referencia > self.data_referencia:
+            self.data_referencia = data_referencia
+
+        abertas = abertas_vida(df)
+        fechadas = ~abertas & criacao.notna().to_numpy()
+        duracoes = np.sort(((fechamento[fechadas] - criacao[fechadas]).dt.total_seconds() / 86400).to_numpy())
+        criacao_abertas = np.sort(criacao[abertas].to_numpy().astype('datetime64[us]'))
+
+        # Intercala os novos valores ordenados nos arrays existentes
+        self.duracoes_fechadas = np.insert(self.duracoes_fechadas, np.searchsorted(self.duracoes_fechadas, duracoes), duracoes)
+        self.criacao_abertas = np.insert(self.criacao_abertas, np.searchsorted(self.criacao_abertas, criacao_abertas), criacao_abertas)
+        self._curva = None
+        return self
+
+    # Curva de sobrevivência: (tempos em dias, S(t) logo após cada tempo com fechamento)
+    def curva_sobrevivencia(self):
+        if self._curva is None:
+            referencia = np.datetime64(self.data_referencia, 'us')
+            # Criação mais recente = menor tempo censurado: inverter mantém a ordem crescente
+            censuradas = ((referencia - self.criacao_abertas[::-1]) / np.timedelta64(1, 'D')).astype(np.float64)
+            duracoes = np.concatenate([self.duracoes_fechadas, censuradas])
+            fechadas = np.concatenate([np.ones(len(self.duracoes_fechadas), dtype=np.int64),
+                                       np.zeros(len(censuradas), dtype=np.int64)])
+            ordem = np.argsort(duracoes, kind='mergesort')
+            duracoes, fechadas = duracoes[ordem], fechadas[ordem]
+
+            tempos, inicio = np.unique(duracoes, return_index=True)
+            # Issues em risco em cada tempo: as que duraram pelo menos esse tempo
+            em_risco = len(duracoes) - inicio
+            fechamentos = np.add.reduceat(fechadas, inicio) if len(tempos) else np.empty(0, dtype=np.int64)
+            com_evento = fechamentos > 0
+            sobrevivencia = np.cumprod(1 - fechamentos[com_evento] / em_risco[com_evento])
+            self._curva = (tempos[com_evento], sobrevivencia)
+        return self._curva
+
+    # Probabilidade de uma issue continuar aberta depois de t dias (vetorizado)
+    def sobrevivencia(self, t):
+        tempos, sobrevivencia = self.curva_sobrevivencia()
+        posicao = np.searchsorted(tempos, t, side='right')
+        return np.concatenate([[1.0], sobrevivencia])[posicao]
+
+    # Idade em dias, na data de referência, de issues criadas nas datas informadas
+    def idades(self, datas_criacao):
+        referencia = np.datetime64(self.data_referencia, 'us')
+        return (referencia - np.asarray(datas_criacao, dtype='datetime64[us]')) / np.timedelta64(1, 'D')
+
+    # Para issues com idade_dias, probabilidade de fechar em cada uma das próximas num_semanas
+    # semanas (colunas 0..num_semanas-1) e de continuar aberta depois delas (última coluna)
+    def probabilidades_fechamento(self, idade_dias, num_semanas):
+        idade_dias = np.asarray(idade_dias, dtype=np.float64)[:, None]
+        limites = self.sobrevivencia(idade_dias + 7 * np.arange(num_semanas + 1))
+        atual = limites[:, :1]
+        # Idade além do último fechamento observado: sem informação, a issue continua aberta
+        sem_informacao = atual[:, 0] <= 0
+        condicional = np.divide(limites, atual, out=np.ones_like(limites), where=~sem_informacao[:, None])
+        return np.maximum(np.concatenate([-np.diff(condicional, axis=1), condicional[:, -1:]], axis=1), 0)
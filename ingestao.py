@@ -0,0 +1,147 @@
+import contextlib
+import glob
+import multiprocessing
+import os
+import sys
+import types
+from concurrent.futures import ProcessPoolExecutor
+
+import openpyxl
+import pandas as pd
+
+# Aba das exportações do SonarQube e colunas tratadas na leitura
+NOME_ABA = "Resultado da consulta"
+COLUNAS_DATA = ['created_at', 'updated_at', 'issue_creation_date', 'issue_update_date', 'issue_close_date']
+COLUNAS_CATEGORIA = ['Projects - Project UUID__kee', 'author_login', 'assignee', 'status', 'resolution',
+                     'severity', 'tags', 'message', 'arquivo_origem']
+EXTENSOES = ('.xlsx', '.csv')
+# Colunas usadas pela projeção
+COLUNAS_PREVISAO = ['Projects - Project UUID__kee', 'author_login', 'status', 'issue_creation_date',
+                    'issue_close_date']
+
+
+# Lista os arquivos de exportação a partir de um arquivo, um diretório, um padrão glob ou uma
+# lista de arquivos
+def listar_exportacoes(origem):
+    if isinstance(origem, (list, tuple)):
+        arquivos = list(origem)
+    elif os.path.isdir(origem):
+        arquivos = [os.path.join(origem, nome) for nome in os.listdir(origem)]
+    else:
+        arquivos = glob.glob(origem)
+    return sorted(arquivo for arquivo in arquivos if arquivo.lower().endswith(EXTENSOES))
+
+
+# Lê um único arquivo de exportação (.xlsx ou .csv), só com as colunas pedidas (None = todas), e
+# marca de qual arquivo veio cada issue
+def ler_exportacao(caminho, colunas=None):
+    if caminho.lower().endswith('.csv'):
+        df = pd.read_csv(caminho, usecols=colunas)
+    else:
+        df = pd.read_excel(caminho, sheet_name=NOME_ABA, engine="openpyxl", usecols=colunas)
+    return _tipar(df, caminho)
+
+
+# Lê uma exportação em lotes de tamanho_lote linhas, só com as colunas pedidas (None = todas) e com a
+# coluna arquivo_origem, como ler_exportacao.
+# O .xlsx é percorrido em modo somente leitura do openpyxl, linha a linha, sem carregar a planilha
+# inteira; o .csv usa a leitura em blocos do pandas. A memória fica limitada ao tamanho do lote.
+def ler_exportacao_em_lotes(caminho, tamanho_lote=50_000, colunas=COLUNAS_PREVISAO):
+    if caminho.lower().endswith('.csv'):
+        with pd.read_csv(caminho, usecols=colunas, chunksize=tamanho_lote) as leitor:
+            for lote in leitor:
+                yield _tipar(lote, caminho)
+        return
+
+    planilha = openpyxl.load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        linhas = planilha[NOME_ABA].iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            return
+        nomes = list(cabecalho) if colunas is None else list(colunas)
+        posicoes = [cabecalho.index(coluna) for coluna in nomes]
+        lote = []
+        for linha in linhas:
+            # Células vazias no fim da linha podem não vir no modo somente leitura
+            lote.append([linha[i] if i < len(linha) else None for i in posicoes])
+            if len(lote) == tamanho_lote:
+                yield _tipar(pd.DataFrame(lote, columns=nomes), caminho)
+                lote = []
+        if lote:
+            yield _tipar(pd.DataFrame(lote, columns=nomes), caminho)
+    finally:
+        planilha.close()
+
+
+# Lê em lotes todas as exportações da origem, uma após a outra
+def ler_exportacoes_em_lotes(origem, tamanho_lote=50_000, colunas=COLUNAS_PREVISAO):
+    arquivos = listar_exportacoes(origem)
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhuma exportação .xlsx ou .csv encontrada em: {origem}")
+    for arquivo in arquivos:
+        yield from ler_exportacao_em_lotes(arquivo, tamanho_lote, colunas)
+
+
+# Converte as colunas de data e marca de qual arquivo veio cada issue
+def _tipar(df, caminho):
+    for coluna in COLUNAS_DATA:
+        if coluna in df.columns:
+            df[coluna] = pd.to_datetime(df[coluna], format='mixed')
+    df['arquivo_origem'] = os.path.basename(caminho)
+    return df
+
+
+# Processos do pool de leitura. Nos dashboards o pool nasce na thread do vigia, dentro do servidor
+# multi-thread do Streamlit, e um fork ali pode herdar travas presas por outras threads.
+CONTEXTO_PROCESSOS = multiprocessing.get_context('spawn')
+
+
+# Com 'spawn', cada processo novo executa de novo o __main__ do pai, e no Streamlit o __main__ é o
+# próprio script do app: cada processo do pool rodaria o dashboard inteiro (e tentaria abrir outro
+# pool). As tarefas só precisam deste módulo, então os processos são iniciados com um __main__ vazio.
+# O __main__ anterior só volta se ninguém (outra sessão do Streamlit) o trocou nesse meio-tempo.
+@contextlib.contextmanager
+def _sem_main():
+    anterior = sys.modules['__main__']
+    vazio = types.ModuleType('__main__')
+    sys.modules['__main__'] = vazio
+    try:
+        yield
+    finally:
+        if sys.modules['__main__'] is vazio:
+            sys.modules['__main__'] = anterior
+
+
+# Carrega todas as exportações da origem em uma única tabela, só com as colunas pedidas (None = todas)
+# e a coluna arquivo_origem.
+# A leitura do openpyxl usa muita CPU, então os arquivos são lidos em paralelo em um pool de
+# processos (um arquivo por tarefa) e o tempo total passa a depender do número de núcleos.
+# Os processos são iniciados com 'spawn' (CONTEXTO_PROCESSOS), todos antes da primeira leitura e
+# com o __main__ trocado por um módulo vazio (_sem_main).
+# As colunas de texto repetitivo viram 'category' depois da concatenação, com categorias
+# comuns a todos os arquivos.
+def carregar_exportacoes(origem, colunas=None, max_processos=None):
+    arquivos = listar_exportacoes(origem)
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhuma exportação .xlsx ou .csv encontrada em: {origem}")
+    if len(arquivos) == 1:
+        partes = [ler_exportacao(arquivos[0], colunas)]
+    else:
+        with ProcessPoolExecutor(max_workers=max_processos, mp_context=CONTEXTO_PROCESSOS) as pool:
+            # Fora do fork, o primeiro submit inicia todos os processos do pool
+            with _sem_main():
+                pool.submit(int)
+            partes = list(pool.map(ler_exportacao, arquivos, [colunas] * len(arquivos)))
+
+    df = pd.concat(partes, ignore_index=True)
+    for coluna in COLUNAS_CATEGORIA:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+
+# Ordena a tabela pela data de criação (ordenação estável, linhas sem data no fim), para as janelas
+# de datas virarem fatias contíguas de linhas (indices.IndiceTempo)
+def ordenar_por_criacao(df):
+    return df.sort_values('issue_creation_date', kind='stable', na_position='last', ignore_index=True)
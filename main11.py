@@ -1,56 +1,45 @@
-import pandas as pd
+import os
+
 import numpy as np
 import streamlit as st
 import matplotlib.pyplot as plt
 
+import pipeline
+import previsao
+
 # Configurações do Streamlit
 st.title("Projeção de Erros por Semana")
 
 # Carregar dados históricos de surgimento de erros
-file_path = "C:\\Projeto Python\\pythonProjectSonarqube\\dados_consulta.xlsx"  # Caminho do arquivo
-df = pd.read_excel(file_path, sheet_name="Resultado da consulta")
-
-# Converter coluna de datas
-df['issue_creation_date'] = pd.to_datetime(df['issue_creation_date'])
+# A leitura, os filtros, as médias semanais e a simulação vêm da cadeia compartilhada (pipeline.py)
+file_path = os.environ.get("DADOS_CONSULTA", "dados_consulta.xlsx")  # Caminho do arquivo
+indice = pipeline.executar('indice', origem=file_path)
 
 # Filtro para autor
-unique_authors = df['author_login'].unique()
-selected_authors = st.multiselect("Selecione os Autores", options=unique_authors, default=unique_authors.tolist())
+unique_authors = indice.valores(previsao.COLUNA_AUTOR)
+selected_authors = st.multiselect("Selecione os Autores", options=unique_authors, default=unique_authors)
 
-# Filtrar DataFrame com base nos autores selecionados
-df_filtered = df[df['author_login'].isin(selected_authors)]
+# Totais e médias semanais dos autores selecionados
+taxas = pipeline.executar('taxas', origem=file_path, autores=selected_authors)
 
 # Cálculo de issues abertas e fechadas
-issues_abertas = df_filtered[df_filtered['status'] == 'OPEN'].shape[0]
-issues_fechadas = df_filtered[df_filtered['status'] == 'CLOSED'].shape[0]
+issues_abertas = int(taxas['issues_abertas'])
+issues_fechadas = int(taxas['issues_fechadas'])
 
 # Exibir cards de total de issues abertas e fechadas
 st.metric("Total de Issues Abertas", issues_abertas)
 st.metric("Total de Issues Fechadas", issues_fechadas)
 
-# Calcular média de erros abertos e fechados por semana
-df_filtered['week'] = df_filtered['issue_creation_date'].dt.to_period('W')
-erros_abertos_por_semana = df_filtered[df_filtered['status'] == 'OPEN'].groupby('week').size().reindex(pd.period_range(df_filtered['week'].min(), df_filtered['week'].max(), freq='W'), fill_value=0)
-erros_fechados_por_semana = df_filtered[df_filtered['status'] == 'CLOSED'].groupby('week').size().reindex(pd.period_range(df_filtered['week'].min(), df_filtered['week'].max(), freq='W'), fill_value=0)
-media_abertos_por_semana = erros_abertos_por_semana.mean()
-media_fechados_por_semana = erros_fechados_por_semana.mean()
-
 # Parâmetros da simulação de Monte Carlo
 num_simulacoes = st.slider("Número de Simulações", min_value=100, max_value=5000, value=1000, step=100)
 num_semanas = st.slider("Projeção para Semanas Futuras", min_value=1, max_value=52, value=12)
 
 # Simulação de Monte Carlo para novos erros abertos e fechados
-simulacoes_abertos = []
-simulacoes_fechados = []
-for _ in range(num_simulacoes):
-    simulacao_abertos = np.random.poisson(media_abertos_por_semana, num_semanas)
-    simulacao_fechados = np.random.poisson(media_fechados_por_semana, num_semanas)
-    simulacoes_abertos.append(simulacao_abertos)
-    simulacoes_fechados.append(simulacao_fechados)
+projecao = pipeline.executar('projecao_poisson', origem=file_path, autores=selected_authors, num_simulacoes=num_simulacoes, num_semanas=num_semanas)
 
 # Médias das simulações para projeções semanais (não acumuladas)
-media_simulacoes_abertos = np.mean(simulacoes_abertos, axis=0)
-media_simulacoes_fechados = np.mean(simulacoes_fechados, axis=0)
+media_simulacoes_abertos = projecao['novas_abertas'].to_numpy()
+media_simulacoes_fechados = projecao['fechadas'].to_numpy()
 
 # Gráfico inicial da projeção acumulada de novos erros e erros fechados
 plt.figure(figsize=(10, 6))
@@ -1,43 +1,67 @@
-import pandas as pd
+import datetime
+import os
+
 import numpy as np
 import streamlit as st
 import plotly.graph_objects as go
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import dados
+import pipeline
+import vigia
 
 st.title("Projeção de Erros por Semana")
 
 st.write("É feito a leitura dos dados históricos de erros que esta disponibilizado na forma de uma planilha '.xlsx'")
-file_path = "dados_consulta.xlsx"
-df = pd.read_excel(file_path, sheet_name="Resultado da consulta")
+st.write("A planilha é lida uma única vez por processo do servidor e fica em uma tabela somente leitura compartilhada por todas as sessões")
+# O caminho pode ser trocado pela variável de ambiente DADOS_CONSULTA (ex.: exportações sintéticas do teste de carga)
+file_path = os.environ.get("DADOS_CONSULTA", "dados_consulta.xlsx")
+
+# Leitura, filtro e contagens por semana vêm da cadeia compartilhada (pipeline.py), com cache por etapa
+# O vigia relê a planilha em segundo plano quando ela muda; a página usa a última versão já aquecida
+origem = vigia.vigiar(pipeline.PIPELINE, ['tabela_compartilhada', 'taxas', 'contagens_por_periodo', 'projecao_poisson'], origem=file_path).parametros()
+tabela = pipeline.executar('tabela_compartilhada', **origem)
 
-st.write("Converter coluna de datas para o tipo datetime")
-df['issue_creation_date'] = pd.to_datetime(df['issue_creation_date'])
+st.write("As datas já são convertidas para datetime e a semana de criação de cada issue já vem calculada na tabela compartilhada")
 
 st.write("Filtra dados por autor, de acordo com a coluna 'author_login'")
-unique_authors = df['author_login'].unique()
+unique_authors = tabela.categorias('author_login')
 st.write("Seleção autores específicos para análise")
-selected_authors = st.multiselect("Selecione os Autores", options=unique_authors, default=unique_authors.tolist())
-# Filtra o DataFrame para conter apenas as issues dos autores selecionados
-df_filtered = df[df['author_login'].isin(selected_authors)]
+selected_authors = st.multiselect("Selecione os Autores", options=unique_authors, default=unique_authors)
+
+st.write("Janela do histórico usada nas médias semanais; a tabela é ordenada pela data de criação e a janela vira uma fatia contígua por busca binária")
+primeira_data, ultima_data = (data.date() for data in pipeline.executar('opcoes', **origem)['datas'])
+periodo = None
+if primeira_data < ultima_data:
+    janela = st.slider("Janela do Histórico", min_value=primeira_data, max_value=ultima_data, value=(primeira_data, ultima_data), step=datetime.timedelta(days=7), format="DD/MM/YYYY")
+    if janela != (primeira_data, ultima_data):
+        periodo = janela
 
 st.write("Contagem de issues abertas e fechadas com base nos autores selecionados")
 st.write("Issues abertas (status 'OPEN') e fechadas (status 'CLOSED')")
-issues_abertas = df_filtered[df_filtered['status'] == 'OPEN'].shape[0]
-issues_fechadas = df_filtered[df_filtered['status'] == 'CLOSED'].shape[0]
+taxas = pipeline.executar('taxas', autores=selected_authors, periodo=periodo, **origem)
+issues_abertas = int(taxas['issues_abertas'])
+issues_fechadas = int(taxas['issues_fechadas'])
 
 # Exibe o total de issues abertas e fechadas em cards
 st.metric("Total de Issues Abertas", issues_abertas)
 st.metric("Total de Issues Fechadas", issues_fechadas)
 
-st.write("Calcula a média semanal de issues abertas e fechadas")
-st.write("Converte a data de criação da issue para um período semanal")
-df_filtered['week'] = df_filtered['issue_creation_date'].dt.to_period('W')
-st.write("Conta o número de issues abertas por semana e preenche semanas sem issues com zero")
-erros_abertos_por_semana = df_filtered[df_filtered['status'] == 'OPEN'].groupby('week').size().reindex(pd.period_range(df_filtered['week'].min(), df_filtered['week'].max(), freq='W'), fill_value=0)
-st.write("Conta o número de issues fechadas por semana e preenche semanas sem issues com zero")
-erros_fechados_por_semana = df_filtered[df_filtered['status'] == 'CLOSED'].groupby('week').size().reindex(pd.period_range(df_filtered['week'].min(), df_filtered['week'].max(), freq='W'), fill_value=0)
-st.write("Calcula a média de issues abertas e fechadas por semana")
-media_abertos_por_semana = erros_abertos_por_semana.mean()
-media_fechados_por_semana = erros_fechados_por_semana.mean()
+st.write("Histórico de issues abertas e fechadas por dia, semana ou mês, contado em uma única passada sobre a tabela compartilhada")
+with st.expander("Histórico por Período"):
+    frequencia = st.radio("Período", options=list(dados.FREQUENCIAS), index=1, format_func={'D': "Dia", 'W': "Semana", 'M': "Mês"}.get, horizontal=True)
+    historico = pipeline.executar('contagens_por_periodo', autores=selected_authors, periodo=periodo, frequencia=frequencia, **origem)
+    fig_historico = go.Figure()
+    for status, nome, cor in [('OPEN', "Issues Abertas", "blue"), ('CLOSED', "Issues Fechadas", "red")]:
+        fig_historico.add_trace(go.Scatter(
+            x=historico.index.to_timestamp(),
+            y=historico[status] if status in historico.columns else [0] * len(historico),
+            mode='lines',
+            name=nome,
+            line=dict(color=cor)
+        ))
+    fig_historico.update_layout(title="Issues Criadas por Período", xaxis_title="Período", yaxis_title="Número de Issues")
+    st.plotly_chart(fig_historico)
 
 # 7. Configuração de parâmetros para Simulação de Monte Carlo
 # Controle deslizante para definir o número de simulações e de semanas futuras
@@ -45,20 +69,12 @@ num_simulacoes = st.slider("Número de Simulações", min_value=100, max_value=5
 num_semanas = st.slider("Projeção para Semanas Futuras", min_value=1, max_value=52, value=12)
 
 # 8. Simulação de Monte Carlo para projeção de novos erros abertos e fechados
-# Listas para armazenar os resultados das simulações
-simulacoes_abertos = []
-simulacoes_fechados = []
 st.write("simulação aleatória baseada na média de issues abertas e fechadas por semana utilizando a distribuição de Poisson")
-for _ in range(num_simulacoes):
-    simulacao_abertos = np.random.poisson(media_abertos_por_semana, num_semanas)
-    simulacao_fechados = np.random.poisson(media_fechados_por_semana, num_semanas)
-    simulacoes_abertos.append(simulacao_abertos)
-    simulacoes_fechados.append(simulacao_fechados)
-
 # 9. Cálculo da média das simulações para cada semana projetada
 st.write("Calcula a média dos resultados de todas as simulações para cada semana futura")
-media_simulacoes_abertos = np.mean(simulacoes_abertos, axis=0)
-media_simulacoes_fechados = np.mean(simulacoes_fechados, axis=0)
+projecao = pipeline.executar('projecao_poisson', autores=selected_authors, periodo=periodo, num_simulacoes=num_simulacoes, num_semanas=num_semanas, **origem)
+media_simulacoes_abertos = projecao['novas_abertas'].to_numpy()
+media_simulacoes_fechados = projecao['fechadas'].to_numpy()
 
 # 10. Cálculo do valor total estimado de issues abertas e fechadas
 st.write("Soma o valor atual de issues abertas e fechadas com as projeções para obter o total estimado")
@@ -134,3 +150,11 @@ fig_fechadas_semanal.update_layout(
 
 # Renderiza o gráfico de issues fechadas no Streamlit
 st.plotly_chart(fig_fechadas_semanal)
+
+st.write("Memória: a tabela compartilhada é carregada uma vez; as etapas em cache também são compartilhadas; cada sessão guarda apenas o seu estado")
+contexto = get_script_run_ctx()
+id_sessao = contexto.session_id if contexto is not None else "local"
+dados.registrar_sessao(id_sessao, [dict(st.session_state)])
+with st.expander("Memória por Sessão"):
+    st.metric("Tabela Compartilhada (bytes)", tabela.nbytes)
+    st.dataframe(dados.memoria_por_sessao())
@@ -1,134 +1,314 @@
-import pandas as pd
+import datetime
+import os
+import time
+
 import numpy as np
+import pandas as pd
 import streamlit as st
 import plotly.graph_objects as go
 
+import pipeline
+import previsao
+import vigia
+
 st.title("Projeção de Erros por Semana")
 
 # 2. Carregar dados históricos de erros
-file_path = "dados_consulta.xlsx"
-df = pd.read_excel(file_path, sheet_name="Resultado da consulta")
+# Aceita um arquivo, um diretório ou um padrão glob com várias exportações (.xlsx/.csv)
+# O caminho pode ser trocado pela variável de ambiente DADOS_CONSULTA (ex.: exportações sintéticas do teste de carga)
+file_path = os.environ.get("DADOS_CONSULTA", "dados_consulta.xlsx")
+
+# A leitura, o índice e as taxas vêm da cadeia compartilhada (pipeline.py): cada etapa fica em
+# cache pelo resumo das suas entradas, então mudar um controle só refaz as etapas que dependem dele
+# Com a variável BANCO_CONSULTA (ex.: issues.duckdb, importado com banco.py), os filtros e as
+# contagens rodam como consultas no banco embutido, sem carregar as issues na memória
+caminho_banco = os.environ.get("BANCO_CONSULTA")
+if caminho_banco:
+    cadeia = pipeline.PIPELINE_BANCO
+    origem = dict(caminho_banco=caminho_banco)
+else:
+    cadeia = pipeline.PIPELINE
+    origem = dict(origem=file_path)
+
+
+# Multiplicadores dos cenários: pontos valores igualmente espaçados na faixa
+def grade_multiplicadores(faixa, pontos):
+    return tuple(np.round(np.linspace(*faixa, pontos), 2))
 
-# 3. Converter coluna de datas para o tipo datetime
-df['issue_creation_date'] = pd.to_datetime(df['issue_creation_date'])
+
+# Valores iniciais dos controles dos cenários (também usados no aquecimento)
+FAIXA_ABERTAS_PADRAO = (0.8, 1.2)
+FAIXA_FECHADAS_PADRAO = (0.8, 1.5)
+PONTOS_PADRAO = 5
+
+# Um vigia em segundo plano relê a origem quando o arquivo muda e aquece a tabela, as taxas e os
+# cenários com os controles iniciais; a página usa sempre a última versão já aquecida, sem esperar
+# a leitura. A projeção padrão (modo progressivo) roda por sessão fora da cadeia e não é aquecida
+cenarios_padrao = dict(multiplicadores_abertas=grade_multiplicadores(FAIXA_ABERTAS_PADRAO, PONTOS_PADRAO),
+                       multiplicadores_fechadas=grade_multiplicadores(FAIXA_FECHADAS_PADRAO, PONTOS_PADRAO))
+vigia_origem = vigia.vigiar(cadeia, ['indice_vida', 'taxas', 'medias_por_regra', ('cenarios', cenarios_padrao)], **origem)
+origem = vigia_origem.parametros()
+st.caption(f"Dados atualizados em {time.strftime('%d/%m/%Y %H:%M:%S', time.localtime(vigia_origem.atualizado_em))}")
+opcoes, indice_vida = cadeia.executar(['opcoes', 'indice_vida'], **origem)
+
+# Filtro opcional por tags (ex.: "accessibility" para a dívida de acessibilidade)
+selected_tags = st.multiselect("Filtrar por Tags", options=opcoes['tags'])
+modo_tags = st.radio("Combinação das Tags", options=['qualquer', 'todas'], format_func=lambda modo: "Qualquer uma (OU)" if modo == 'qualquer' else "Todas (E)", horizontal=True)
 
 # 4. Filtra dados por autor
-unique_authors = df['author_login'].unique()
+unique_authors = opcoes['autores']
 # Seleção autores específicos para análise
-selected_authors = st.multiselect("Selecione os Autores", options=unique_authors, default=unique_authors.tolist())
-# Filtra o DataFrame para conter apenas as issues dos autores selecionados
-df_filtered = df[df['author_login'].isin(selected_authors)]
+selected_authors = st.multiselect("Selecione os Autores", options=unique_authors, default=unique_authors)
+# Janela do histórico usada nas médias semanais (ex.: só as últimas semanas, depois de uma mudança no time).
+# A tabela fica ordenada pela data de criação, então a janela é uma fatia contígua achada por busca binária
+primeira_data, ultima_data = (data.date() for data in opcoes['datas'])
+periodo = None
+if primeira_data < ultima_data:
+    janela = st.slider("Janela do Histórico", min_value=primeira_data, max_value=ultima_data, value=(primeira_data, ultima_data), step=datetime.timedelta(days=7), format="DD/MM/YYYY")
+    # O histórico completo fica como None, para reaproveitar as etapas já calculadas (e aquecidas pelo vigia)
+    if janela != (primeira_data, ultima_data):
+        periodo = janela
+# Parâmetros da seleção usados pelas etapas da cadeia
+selecao = dict(origem, tags=selected_tags, modo_tags=modo_tags, autores=selected_authors, periodo=periodo)
+# Soma as taxas pré-calculadas dos autores selecionados, sem refiltrar as issues
+taxas_selecionadas = cadeia.executar('taxas', **selecao)
 
 # 5. Contagem de issues abertas e fechadas com base nos autores selecionados
 # Issues abertas (status "OPEN") e fechadas (status "CLOSED")
-issues_abertas = df_filtered[df_filtered['status'] == 'OPEN'].shape[0]
-issues_fechadas = df_filtered[df_filtered['status'] == 'CLOSED'].shape[0]
+issues_abertas = int(taxas_selecionadas['issues_abertas'])
+issues_fechadas = int(taxas_selecionadas['issues_fechadas'])
 
 # Exibe o total de issues abertas e fechadas em cards
 st.metric("Total de Issues Abertas", issues_abertas)
 st.metric("Total de Issues Fechadas", issues_fechadas)
 
-# 6. Calcula a média semanal de issues abertas e fechadas
-# Converte a data de criação da issue para um período semanal
-df_filtered['week'] = df_filtered['issue_creation_date'].dt.to_period('W')
-# Conta o número de issues abertas por semana e preenche semanas sem issues com zero
-erros_abertos_por_semana = df_filtered[df_filtered['status'] == 'OPEN'].groupby('week').size().reindex(pd.period_range(df_filtered['week'].min(), df_filtered['week'].max(), freq='W'), fill_value=0)
-# Conta o número de issues fechadas por semana e preenche semanas sem issues com zero
-erros_fechados_por_semana = df_filtered[df_filtered['status'] == 'CLOSED'].groupby('week').size().reindex(pd.period_range(df_filtered['week'].min(), df_filtered['week'].max(), freq='W'), fill_value=0)
-# Calcula a média de issues abertas e fechadas por semana
-media_abertos_por_semana = erros_abertos_por_semana.mean()
-media_fechados_por_semana = erros_fechados_por_semana.mean()
+# 6. Média semanal de issues abertas e fechadas dos autores selecionados
+media_abertos_por_semana = taxas_selecionadas['media_abertos_por_semana']
+media_fechados_por_semana = taxas_selecionadas['media_fechados_por_semana']
 
 # 7. Configuração de parâmetros para Simulação de Monte Carlo
-# Controle deslizante para definir o número de simulações e de semanas futuras
-num_simulacoes = st.slider("Número de Simulações", min_value=100, max_value=5000, value=1000, step=100)
+# No modo progressivo a simulação roda em segundo plano e para sozinha quando atinge a precisão pedida;
+# no modo fixo o número de simulações é definido no controle deslizante
+modo_progressivo = st.checkbox("Simulação progressiva (para automaticamente ao atingir a precisão)", value=True)
+if modo_progressivo:
+    tolerancia = st.number_input("Erro padrão máximo do backlog médio (issues)", min_value=0.01, value=0.5, step=0.1)
+else:
+    num_simulacoes = st.slider("Número de Simulações", min_value=100, max_value=5000, value=1000, step=100)
 num_semanas = st.slider("Projeção para Semanas Futuras", min_value=1, max_value=52, value=12)
 
-# 8. Simulação de Monte Carlo para projeção de novos erros abertos e fechados
-# Listas para armazenar os resultados das simulações
-simulacoes_abertos = []
-simulacoes_fechados = []
-for _ in range(num_simulacoes):
-    # Gera uma simulação aleatória baseada na média de issues abertas e fechadas por semana
-    simulacao_abertos = np.random.poisson(media_abertos_por_semana, num_semanas)
-    simulacao_fechados = np.random.poisson(media_fechados_por_semana, num_semanas)
-    simulacoes_abertos.append(simulacao_abertos)
-    simulacoes_fechados.append(simulacao_fechados)
-
-# 9. Cálculo da média das simulações para cada semana projetada
-# Calcula a média dos resultados de todas as simulações para cada semana futura
-media_simulacoes_abertos = np.mean(simulacoes_abertos, axis=0)
-media_simulacoes_fechados = np.mean(simulacoes_fechados, axis=0)
-
-# 10. Cálculo do valor total estimado de issues abertas e fechadas
-# Soma o valor atual de issues abertas e fechadas com as projeções para obter o total estimado
-total_est_issues_abertas = issues_abertas + np.sum(media_simulacoes_abertos)
-total_est_issues_fechadas = issues_fechadas + np.sum(media_simulacoes_fechados)
-
-# Exibe os novos totais estimados de issues abertas e fechadas em cards no Streamlit
-st.metric("Total Estimado de Issues Abertas", int(total_est_issues_abertas))
-st.metric("Total Estimado de Issues Fechadas", int(total_est_issues_fechadas))
-
-# 11. Gráfico acumulado da projeção de novos erros abertos e fechados
-# Cria uma figura usando Plotly para exibir o crescimento acumulado das issues abertas e fechadas
-fig_acumulado = go.Figure()
-fig_acumulado.add_trace(go.Scatter(
-    x=list(range(1, num_semanas + 1)),
-    y=np.cumsum(media_simulacoes_abertos) + issues_abertas,
-    mode='lines+markers',
-    name="Erros Abertos (Acumulado)",
-    line=dict(color="blue")
-))
-fig_acumulado.add_trace(go.Scatter(
-    x=list(range(1, num_semanas + 1)),
-    y=np.cumsum(media_simulacoes_fechados) + issues_fechadas,
-    mode='lines+markers',
-    name="Erros Fechados (Acumulado)",
-    line=dict(color="red")
-))
-fig_acumulado.update_layout(
-    title="Projeção Acumulada de Erros Abertos e Fechados por Semana",
-    xaxis_title="Semanas Futuras",
-    yaxis_title="Número Estimado de Erros (Acumulado)",
-    legend_title="Status"
-)
-
-# Renderiza o gráfico acumulado no Streamlit
-st.plotly_chart(fig_acumulado)
-
-# 12. Gráfico da projeção semanal de novas issues abertas
-# Cria uma figura para exibir a projeção semanal de novas issues abertas
-fig_abertas_semanal = go.Figure()
-fig_abertas_semanal.add_trace(go.Scatter(
-    x=list(range(1, num_semanas + 1)),
-    y=media_simulacoes_abertos,
-    mode='lines+markers',
-    name="Novas Issues Abertas",
-    line=dict(color="blue")
-))
-fig_abertas_semanal.update_layout(
-    title="Projeção de Novas Issues Abertas por Semana",
-    xaxis_title="Semanas Futuras",
-    yaxis_title="Número Estimado de Novas Issues Abertas"
-)
-
-# Renderiza o gráfico de novas issues abertas no Streamlit
-st.plotly_chart(fig_abertas_semanal)
-
-# 13. Gráfico da projeção semanal de issues fechadas
-fig_fechadas_semanal = go.Figure()
-fig_fechadas_semanal.add_trace(go.Scatter(
-    x=list(range(1, num_semanas + 1)),
-    y=media_simulacoes_fechados,
-    mode='lines+markers',
-    name="Issues Fechadas",
-    line=dict(color="red")
-))
-fig_fechadas_semanal.update_layout(
-    title="Projeção de Issues Fechadas por Semana",
-    xaxis_title="Semanas Futuras",
-    yaxis_title="Número Estimado de Issues Fechadas"
-)
-
-# Renderiza o gráfico de issues fechadas no Streamlit
-st.plotly_chart(fig_fechadas_semanal)
\ No newline at end of file
+# Projeção de novas issues abertas por regra no horizonte escolhido (média semanal x semanas)
+medias_por_regra = cadeia.executar('medias_por_regra', **selecao)
+with st.expander("Projeção de Novas Issues Abertas por Regra"):
+    st.dataframe(pd.DataFrame({
+        "Média Semanal": medias_por_regra,
+        f"Estimativa em {num_semanas} Semanas": medias_por_regra * num_semanas,
+    }))
+# Métodos com redução de variância atingem a mesma precisão com menos simulações
+amostragem = st.selectbox("Método de Amostragem", options=previsao.METODOS_AMOSTRAGEM)
+# Fechamentos pela média semanal histórica ou pela curva de sobrevivência (tempo até o fechamento),
+# ou pela reamostragem em blocos das semanas históricas (abertas e fechadas), que mantém as semanas com picos
+modelo_fechamento = st.radio("Modelo de Fechamento", options=['media', 'sobrevivencia', 'bootstrap'], format_func={
+    'media': "Média semanal de fechamentos", 'sobrevivencia': "Curva de sobrevivência das issues", 'bootstrap': "Reamostragem de semanas do histórico"}.get, horizontal=True)
+if modelo_fechamento == 'bootstrap':
+    semanas_por_bloco = st.slider("Semanas consecutivas por bloco", min_value=1, max_value=12, value=4)
+    # Contagens semanais do histórico da seleção, reamostradas aos pares (abertas, fechadas)
+    contagens_semanais = cadeia.executar('contagens_semanais', **selecao)
+if modelo_fechamento == 'sobrevivencia':
+    idades_abertas = cadeia.executar('idades_abertas', **selecao)
+    # Cada issue aberta hoje entra no backlog inicial, com sua idade
+    issues_abertas = len(idades_abertas)
+    # Novas issues chegam pela média de todas as criadas (qualquer status): a curva fecha parte delas
+    media_abertos_por_semana = cadeia.executar('media_criadas_por_semana', **selecao)
+
+# Áreas da página atualizadas a cada projeção parcial
+area_status = st.empty()
+area_total_abertas = st.empty()
+area_total_fechadas = st.empty()
+area_acumulado = st.empty()
+area_abertas_semanal = st.empty()
+area_fechadas_semanal = st.empty()
+
+
+def exibir_projecao(projecao):
+    # 9. Média das simulações para cada semana projetada
+    media_simulacoes_abertos = projecao['novas_abertas'].to_numpy()
+    media_simulacoes_fechados = projecao['fechadas'].to_numpy()
+
+    # 10. Cálculo do valor total estimado de issues abertas e fechadas
+    # Issues abertas: backlog médio ao final do horizonte; fechadas: valor atual + fechamentos projetados
+    total_est_issues_abertas = projecao['backlog_medio'].iloc[-1]
+    total_est_issues_fechadas = issues_fechadas + np.sum(media_simulacoes_fechados)
+
+    # Exibe os novos totais estimados de issues abertas e fechadas em cards no Streamlit
+    area_total_abertas.metric("Total Estimado de Issues Abertas", int(total_est_issues_abertas))
+    area_total_fechadas.metric("Total Estimado de Issues Fechadas", int(total_est_issues_fechadas))
+
+    # 11. Gráfico acumulado da projeção de erros abertos (backlog) e fechados
+    # A faixa sombreada mostra o intervalo de 5% a 95% das simulações do backlog
+    fig_acumulado = go.Figure()
+    fig_acumulado.add_trace(go.Scatter(
+        x=list(range(1, num_semanas + 1)),
+        y=projecao['backlog_p95'],
+        mode='lines',
+        line=dict(width=0),
+        showlegend=False
+    ))
+    fig_acumulado.add_trace(go.Scatter(
+        x=list(range(1, num_semanas + 1)),
+        y=projecao['backlog_p5'],
+        mode='lines',
+        line=dict(width=0),
+        fill='tonexty',
+        fillcolor="rgba(0, 0, 255, 0.15)",
+        name="Erros Abertos (5% a 95%)"
+    ))
+    fig_acumulado.add_trace(go.Scatter(
+        x=list(range(1, num_semanas + 1)),
+        y=projecao['backlog_medio'],
+        mode='lines+markers',
+        name="Erros Abertos (Backlog)",
+        line=dict(color="blue")
+    ))
+    fig_acumulado.add_trace(go.Scatter(
+        x=list(range(1, num_semanas + 1)),
+        y=np.cumsum(media_simulacoes_fechados) + issues_fechadas,
+        mode='lines+markers',
+        name="Erros Fechados (Acumulado)",
+        line=dict(color="red")
+    ))
+    fig_acumulado.update_layout(
+        title="Projeção Acumulada de Erros Abertos e Fechados por Semana",
+        xaxis_title="Semanas Futuras",
+        yaxis_title="Número Estimado de Erros (Acumulado)",
+        legend_title="Status"
+    )
+
+    # Renderiza o gráfico acumulado no Streamlit
+    area_acumulado.plotly_chart(fig_acumulado)
+
+    # 12. Gráfico da projeção semanal de novas issues abertas
+    # Cria uma figura para exibir a projeção semanal de novas issues abertas
+    fig_abertas_semanal = go.Figure()
+    fig_abertas_semanal.add_trace(go.Scatter(
+        x=list(range(1, num_semanas + 1)),
+        y=media_simulacoes_abertos,
+        mode='lines+markers',
+        name="Novas Issues Abertas",
+        line=dict(color="blue")
+    ))
+    fig_abertas_semanal.update_layout(
+        title="Projeção de Novas Issues Abertas por Semana",
+        xaxis_title="Semanas Futuras",
+        yaxis_title="Número Estimado de Novas Issues Abertas"
+    )
+
+    # Renderiza o gráfico de novas issues abertas no Streamlit
+    area_abertas_semanal.plotly_chart(fig_abertas_semanal)
+
+    # 13. Gráfico da projeção semanal de issues fechadas
+    fig_fechadas_semanal = go.Figure()
+    fig_fechadas_semanal.add_trace(go.Scatter(
+        x=list(range(1, num_semanas + 1)),
+        y=media_simulacoes_fechados,
+        mode='lines+markers',
+        name="Issues Fechadas",
+        line=dict(color="red")
+    ))
+    fig_fechadas_semanal.update_layout(
+        title="Projeção de Issues Fechadas por Semana",
+        xaxis_title="Semanas Futuras",
+        yaxis_title="Número Estimado de Issues Fechadas"
+    )
+
+    # Renderiza o gráfico de issues fechadas no Streamlit
+    area_fechadas_semanal.plotly_chart(fig_fechadas_semanal)
+
+
+# 8. Simulação de Monte Carlo do backlog de issues abertas
+# Cada simulação acompanha o saldo de issues abertas semana a semana; só fecha o que está aberto
+if modo_progressivo:
+    # Se os parâmetros mudaram, cancela a simulação anterior e inicia outra. A origem entra com a
+    # assinatura publicada pelo vigia, como nas chaves da cadeia: uma exportação nova reinicia a simulação
+    parametros = (tuple(sorted(origem.items())), tuple(selected_tags), modo_tags, tuple(selected_authors), periodo, num_semanas, tolerancia, amostragem, modelo_fechamento,
+                  semanas_por_bloco if modelo_fechamento == 'bootstrap' else None)
+    simulacao = st.session_state.get('simulacao')
+    if simulacao is None or st.session_state.get('parametros_simulacao') != parametros:
+        if simulacao is not None:
+            simulacao.cancelar()
+        if modelo_fechamento == 'bootstrap':
+            simulacao = previsao.SimulacaoProgressiva(issues_abertas, media_abertos_por_semana, media_fechados_por_semana, num_semanas, tolerancia=tolerancia, historico=(contagens_semanais['abertas'].to_numpy(), contagens_semanais['fechadas'].to_numpy()), semanas_por_bloco=semanas_por_bloco).iniciar()
+        elif modelo_fechamento == 'sobrevivencia':
+            simulacao = previsao.SimulacaoProgressiva(issues_abertas, media_abertos_por_semana, media_fechados_por_semana, num_semanas, tolerancia=tolerancia, indice_vida=indice_vida, idades_abertas=idades_abertas).iniciar()
+        else:
+            simulacao = previsao.SimulacaoProgressiva(issues_abertas, media_abertos_por_semana, media_fechados_por_semana, num_semanas, tolerancia=tolerancia, amostragem=amostragem).iniciar()
+        st.session_state['simulacao'] = simulacao
+        st.session_state['parametros_simulacao'] = parametros
+
+    # Atualiza os gráficos com as projeções parciais até a simulação terminar.
+    # Se o usuário mudar um controle, o Streamlit interrompe este laço e executa o script de novo.
+    exibidas = 0
+    while True:
+        concluida = simulacao.concluida
+        projecao, num_simulacoes, erro_padrao = simulacao.resultado()
+        if projecao is not None and num_simulacoes != exibidas:
+            exibidas = num_simulacoes
+            situacao = "concluída" if concluida else "em andamento"
+            # O erro padrão só é estimado depois de alguns blocos de simulações
+            erro = f"{erro_padrao:.2f}" if np.isfinite(erro_padrao) else "ainda não estimado"
+            area_status.caption(f"Simulação {situacao}: {num_simulacoes} simulações, erro padrão máximo do backlog médio {erro}")
+            exibir_projecao(projecao)
+        if concluida:
+            break
+        time.sleep(0.2)
+elif modelo_fechamento == 'bootstrap':
+    projecao = cadeia.executar('projecao_bootstrap', num_simulacoes=num_simulacoes, num_semanas=num_semanas, semanas_por_bloco=semanas_por_bloco, **selecao)
+    exibir_projecao(projecao)
+elif modelo_fechamento == 'sobrevivencia':
+    projecao = cadeia.executar('projecao_sobrevivencia', num_simulacoes=num_simulacoes, num_semanas=num_semanas, **selecao)
+    exibir_projecao(projecao)
+else:
+    projecao = cadeia.executar('projecao', num_simulacoes=num_simulacoes, num_semanas=num_semanas, amostragem=amostragem, **selecao)
+    exibir_projecao(projecao)
+
+# 14. Cenários "e se": multiplicadores sobre as taxas de abertura e de fechamento em vários horizontes.
+# A grade inteira roda numa única simulação vetorizada, com os mesmos sorteios em todos os cenários,
+# então as diferenças entre cenários não são ruído de simulações diferentes
+with st.expander("Cenários (E se...)"):
+    st.caption("Os cenários usam o modelo de média semanal de fechamentos; 1,0 = taxa histórica")
+    faixa_abertas = st.slider("Multiplicador da taxa de abertura", min_value=0.5, max_value=2.0, value=FAIXA_ABERTAS_PADRAO, step=0.05)
+    faixa_fechadas = st.slider("Multiplicador da taxa de fechamento", min_value=0.5, max_value=2.0, value=FAIXA_FECHADAS_PADRAO, step=0.05)
+    pontos = st.slider("Valores por multiplicador", min_value=2, max_value=10, value=PONTOS_PADRAO)
+    opcoes_horizonte = sorted({4, 8, 12, 26, 52, num_semanas})
+    horizontes = st.multiselect("Horizontes (semanas)", options=opcoes_horizonte, default=[num_semanas])
+    simulacoes_cenarios = st.slider("Simulações por cenário", min_value=100, max_value=5000, value=1000, step=100)
+    if horizontes:
+        multiplicadores_abertas = grade_multiplicadores(faixa_abertas, pontos)
+        multiplicadores_fechadas = grade_multiplicadores(faixa_fechadas, pontos)
+        cenarios = cadeia.executar('cenarios', multiplicadores_abertas=multiplicadores_abertas, multiplicadores_fechadas=multiplicadores_fechadas,
+                                   horizontes=horizontes, num_simulacoes=simulacoes_cenarios, amostragem=amostragem, **selecao)
+
+        # Mapa de calor do backlog médio (ou da diferença para o cenário atual) em um horizonte
+        horizonte = st.selectbox("Horizonte do mapa", options=sorted(horizontes), index=len(horizontes) - 1)
+        medida = st.radio("Medida", options=['backlog_medio', 'diferenca_base', 'prob_reduzir'], format_func={
+            'backlog_medio': "Backlog médio", 'diferenca_base': "Diferença para o cenário atual", 'prob_reduzir': "Probabilidade de reduzir o backlog"}.get, horizontal=True)
+        mapa = cenarios.xs(horizonte, level='horizonte')[medida].unstack('mult_fechadas')
+        fig_cenarios = go.Figure(go.Heatmap(
+            z=mapa.to_numpy(),
+            x=[f"{m:.2f}" for m in mapa.columns],
+            y=[f"{m:.2f}" for m in mapa.index],
+            colorscale='RdYlGn' if medida == 'prob_reduzir' else 'RdYlGn_r',
+            text=np.round(mapa.to_numpy(), 2),
+            texttemplate="%{text}"
+        ))
+        fig_cenarios.update_layout(
+            title=f"Cenários em {horizonte} Semanas",
+            xaxis_title="Multiplicador da Taxa de Fechamento",
+            yaxis_title="Multiplicador da Taxa de Abertura"
+        )
+        st.plotly_chart(fig_cenarios)
+        # Tabela de comparação de todos os cenários e horizontes
+        st.dataframe(cenarios)
+
+# Tempo e acertos de cache de cada etapa da cadeia (compartilhada por todas as sessões)
+with st.expander("Etapas da Projeção"):
+    st.dataframe(cadeia.estatisticas())
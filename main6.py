@@ -1,55 +1,44 @@
-import pandas as pd
-import numpy as np
+import os
+
 import streamlit as st
 import matplotlib.pyplot as plt
 
+import pipeline
+import previsao
+
 # Configurações do Streamlit
 st.title("Projeção de Surgimento de Novos Erros por Semana")
 
 # Carregar dados históricos de surgimento de erros
-file_path = "C:\\Projeto Python\\pythonProjectSonarqube\\dados_consulta.xlsx"  # Caminho do arquivo
-df = pd.read_excel(file_path, sheet_name="Resultado da consulta")
-
-# Converter coluna de datas
-df['issue_creation_date'] = pd.to_datetime(df['issue_creation_date'])
+# A leitura, os filtros, as médias semanais e a simulação vêm da cadeia compartilhada (pipeline.py)
+file_path = os.environ.get("DADOS_CONSULTA", "dados_consulta.xlsx")  # Caminho do arquivo
+indice = pipeline.executar('indice', origem=file_path)
 
 # Filtro para autor
-unique_authors = df['author_login'].unique()
-selected_authors = st.multiselect("Selecione os Autores", options=unique_authors, default=unique_authors.tolist())
-
-# Filtrar DataFrame com base nos autores selecionados
-df = df[df['author_login'].isin(selected_authors)]
+unique_authors = indice.valores(previsao.COLUNA_AUTOR)
+selected_authors = st.multiselect("Selecione os Autores", options=unique_authors, default=unique_authors)
 
 # Cálculo de issues abertas e fechadas
-total_issues = df.shape[0]
-issues_abertas = df[df['status'] == 'OPEN'].shape[0]
-issues_fechadas = df[df['status'] == 'CLOSED'].shape[0]
+taxas = pipeline.executar('taxas', origem=file_path, autores=selected_authors)
+issues_abertas = int(taxas['issues_abertas'])
+issues_fechadas = int(taxas['issues_fechadas'])
 
 # Exibir cards de total de issues abertas e fechadas
 st.metric("Total de Issues Abertas", issues_abertas)
 st.metric("Total de Issues Fechadas", issues_fechadas)
 
 # Calcular média de erros por semana para cada projeto
-df['week'] = df['issue_creation_date'].dt.to_period('W')
-erros_por_semana = df.groupby(['Projects - Project UUID__kee', 'week']).size().unstack(fill_value=0)
-media_erros_por_semana = erros_por_semana.mean(axis=1)
+media_erros_por_semana = pipeline.executar('medias_novas_por_projeto', origem=file_path, autores=selected_authors)
 
 # Parâmetros da simulação de Monte Carlo
 num_simulacoes = st.slider("Número de Simulações", min_value=100, max_value=5000, value=1000, step=100)
 num_semanas = st.slider("Projeção para Semanas Futuras", min_value=1, max_value=52, value=12)
 
 # Simulação de Monte Carlo
-simulacoes_erros = []
-for _ in range(num_simulacoes):
-    sim_proj = []
-    for media in media_erros_por_semana:
-        # Gera projeção para cada projeto com base na média de erros por semana
-        simulacao = np.random.poisson(media, num_semanas)
-        sim_proj.append(simulacao)
-    simulacoes_erros.append(np.array(sim_proj).sum(axis=0))
+# Cada projeto segue um Poisson com a sua média; a soma dos projetos é Poisson com a soma das médias
+media_simulacoes = pipeline.executar('projecao_novos', origem=file_path, autores=selected_authors, num_simulacoes=num_simulacoes, num_semanas=num_semanas)
 
 # Gráfico da projeção de novos erros
-media_simulacoes = np.mean(simulacoes_erros, axis=0)
 plt.figure(figsize=(10, 6))
 plt.plot(range(1, num_semanas + 1), media_simulacoes, marker='o', color="blue")
 plt.title("Projeção de Surgimento de Novos Erros por Semana")
@@ -0,0 +1,57 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import previsao
+
+# As mensagens do SonarQube repetem o mesmo texto de cada regra com partes variáveis, ex.:
+# "Remove this unused import of 'HttpClient'." ou "A página contém palavras que não são em português: name".
+# O modelo (a regra) é obtido trocando as partes variáveis por {}:
+# trechos entre aspas, números e o complemento depois de ": " no fim da mensagem.
+PADROES_VARIAVEIS = [
+    (re.compile(r'"[^"]*"'), '"{}"'),
+    (re.compile(r"'[^']*'"), "'{}'"),
+    (re.compile(r'`[^`]*`'), '`{}`'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '{}'),
+    (re.compile(r': [^.:]+$'), ': {}'),
+]
+COLUNA_MENSAGEM = 'message'
+COLUNA_REGRA = 'regra'
+
+
+# Extrai o modelo (regra) de uma mensagem
+def extrair_regra(mensagem):
+    regra = str(mensagem)
+    for padrao, substituto in PADROES_VARIAVEIS:
+        regra = padrao.sub(substituto, regra)
+    return regra
+
+
+# Adiciona a coluna 'regra' codificada por dicionário (category).
+# A expressão regular roda uma vez por mensagem distinta (categoria), não por linha: os códigos
+# das mensagens são apenas remapeados para os códigos das regras.
+def adicionar_regras(df):
+    mensagens = df[COLUNA_MENSAGEM].astype('category')
+    regras_por_mensagem = pd.Series([extrair_regra(m) for m in mensagens.cat.categories])
+    categorias_regra = pd.Index(regras_por_mensagem.unique())
+    codigo_por_mensagem = categorias_regra.get_indexer(regras_por_mensagem)
+    # Mensagens ausentes (código -1) ficam sem regra; sem nenhuma mensagem, a coluna fica toda vazia
+    codigos = mensagens.cat.codes.to_numpy()
+    codigos_regra = np.full(len(codigos), -1, dtype=np.int64)
+    validos = codigos >= 0
+    codigos_regra[validos] = codigo_por_mensagem[codigos[validos]]
+    df[COLUNA_MENSAGEM] = mensagens
+    df[COLUNA_REGRA] = pd.Categorical.from_codes(codigos_regra, categories=categorias_regra)
+    return df
+
+
+# Contagem semanal de issues por regra (linhas = regras, colunas = semanas), com zero nas semanas
+# sem issues. semanas permite usar o intervalo do histórico completo ao contar um subconjunto.
+def contar_regras_por_semana(df, status=previsao.STATUS_ABERTO, semanas=None):
+    if semanas is None:
+        semanas = previsao.semanas_do_historico(df)
+    df_status = df[df['status'] == status]
+    contagem = df_status.groupby([COLUNA_REGRA, df_status['issue_creation_date'].dt.to_period('W')],
+                                 observed=True).size()
+    return contagem.unstack(fill_value=0).reindex(columns=semanas, fill_value=0)
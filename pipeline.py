@@ -0,0 +1,499 @@
+import hashlib
+import os
+import pickle
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+import banco
+import dados
+import indices
+import ingestao
+import mensagens
+import previsao
+
+# Cadeia de projeção compartilhada pelos apps (main2.py ... main15.py):
+# carregar -> indexar -> filtrar -> agregar por semana -> simular.
+# Cada etapa é uma função pura registrada com @estagio, que declara de quais parâmetros ou
+# etapas anteriores depende (as entradas são os nomes dos argumentos). A saída de cada etapa fica
+# em cache pela chave da etapa: um resumo (hash) do nome da etapa com as chaves das entradas, e
+# dos parâmetros pelo valor. Assim, mudar um parâmetro só recalcula as etapas que dependem dele:
+# trocar os autores refaz as taxas e a simulação, mas não relê a planilha nem remonta o índice.
+# A origem entra pela assinatura dos arquivos (caminho, tamanho e data de modificação), então
+# uma nova exportação invalida toda a cadeia a partir da leitura. Nos dashboards, a assinatura é
+# informada como parâmetro pelo vigia.py, que aquece a cadeia antes de publicar uma exportação nova.
+# Os resultados em cache são compartilhados entre as sessões e não devem ser alterados.
+#
+# Uso: pipeline.executar('projecao', origem="dados_consulta.xlsx", autores=('fulano',), num_semanas=12)
+#      pipeline.PIPELINE_BANCO.executar('projecao', caminho_banco="issues.duckdb", autores=('fulano',))
+
+ESTAGIOS = {}
+# Etapas que trocam as do ESTAGIOS quando as issues estão num banco embutido (banco.py): os filtros
+# e as contagens viram consultas SQL e as etapas seguintes (simulações) são as mesmas
+ESTAGIOS_BANCO = {}
+
+# Parâmetros usados quando o app não informa um valor
+PARAMETROS_PADRAO = {
+    'tags': (),
+    'modo_tags': 'qualquer',
+    'autores': None,
+    'projetos': None,
+    'num_simulacoes': 1000,
+    'num_semanas': 12,
+    'amostragem': 'aleatoria',
+    'frequencia': 'W',
+    'multiplicadores_abertas': (1.0,),
+    'multiplicadores_fechadas': (1.0,),
+    'horizontes': (12,),
+    'semanas_por_bloco': 4,
+    'periodo': None,
+}
+# Parâmetros que são conjuntos de valores: a ordem da seleção não muda o resultado nem o cache
+PARAMETROS_CONJUNTO = ('tags', 'autores', 'projetos', 'multiplicadores_abertas', 'multiplicadores_fechadas', 'horizontes')
+
+
+# Registra uma função como etapa da cadeia; as entradas são os nomes dos seus argumentos.
+# Etapas voláteis rodam a cada execução e a chave vem do valor produzido (ex.: assinatura dos arquivos).
+# nome permite registrar a etapa com outro nome (ex.: a versão SQL de uma etapa em ESTAGIOS_BANCO).
+def estagio(funcao=None, volatil=False, registro=ESTAGIOS, nome=None):
+    def registrar(funcao):
+        entradas = funcao.__code__.co_varnames[:funcao.__code__.co_argcount]
+        registro[nome or funcao.__name__] = (funcao, entradas, volatil)
+        return funcao
+    return registrar(funcao) if funcao is not None else registrar
+
+
+class Pipeline:
+    def __init__(self, estagios=ESTAGIOS, tamanho_cache=256):
+        self.estagios = estagios
+        self.tamanho_cache = tamanho_cache
+        self.cache = OrderedDict()
+        # Por etapa: [execuções, acertos no cache, segundos no total, segundos na última execução]
+        self.contadores = {}
+        # Chaves que não saem do cache por grupo (ex.: as etapas aquecidas pelo vigia.py)
+        self.fixadas = {}
+        self._trava = threading.Lock()
+        # Travas por chave em cálculo: somem sozinhas quando nenhuma thread as usa (acerto de cache,
+        # cálculo concluído ou com erro), então o dicionário não cresce com as chaves que já saíram do cache
+        self._travas_chave = weakref.WeakValueDictionary()
+
+    # Valor de uma etapa (ou tupla de valores, se alvo for uma lista de etapas) para os parâmetros
+    def executar(self, alvo, **parametros):
+        return self._executar(alvo, self._contexto(parametros))
+
+    # Como executar, mas as etapas calculadas (e as que elas usaram) ficam fixas no cache, trocando
+    # as fixadas antes pelo mesmo grupo
+    def fixar(self, grupo, alvo, **parametros):
+        contexto = self._contexto(parametros)
+        valor = self._executar(alvo, contexto)
+        with self._trava:
+            self.fixadas[grupo] = set(contexto['chaves'].values())
+        return valor
+
+    def _contexto(self, parametros):
+        return {'parametros': _normalizar({**PARAMETROS_PADRAO, **parametros}), 'chaves': {}, 'valores': {}}
+
+    def _executar(self, alvo, contexto):
+        if isinstance(alvo, (list, tuple)):
+            return tuple(self._valor(nome, contexto) for nome in alvo)
+        return self._valor(alvo, contexto)
+
+    # Chave de cache da etapa, calculada só a partir das chaves das entradas (sem executar nada,
+    # exceto etapas voláteis). As etapas do caminho são marcadas como usadas recentemente.
+    def _chave(self, nome, contexto):
+        if nome in contexto['chaves']:
+            return contexto['chaves'][nome]
+        if nome in contexto['parametros'] and self.estagios.get(nome, (None, None, False))[2]:
+            # Valor de uma etapa volátil informado pelo chamador (ex.: assinatura publicada pelo vigia.py)
+            chave = _resumo(('volatil', nome, contexto['parametros'][nome]))
+        elif nome in contexto['parametros']:
+            chave = _resumo(('parametro', nome, contexto['parametros'][nome]))
+        elif nome not in self.estagios:
+            raise KeyError(f"Etapa ou parâmetro desconhecido: {nome}")
+        else:
+            funcao, entradas, volatil = self.estagios[nome]
+            if volatil:
+                valor = funcao(*[self._valor(entrada, contexto) for entrada in entradas])
+                contexto['valores'][nome] = valor
+                chave = _resumo(('volatil', nome, valor))
+            else:
+                chave = _resumo(('estagio', nome) + tuple(self._chave(entrada, contexto) for entrada in entradas))
+                with self._trava:
+                    if chave in self.cache:
+                        self.cache.move_to_end(chave)
+        contexto['chaves'][nome] = chave
+        return chave
+
+    def _valor(self, nome, contexto):
+        if nome in contexto['valores']:
+            return contexto['valores'][nome]
+        if nome in contexto['parametros']:
+            return contexto['parametros'][nome]
+        chave = self._chave(nome, contexto)
+        if nome in contexto['valores']:
+            return contexto['valores'][nome]
+
+        # Uma trava por chave: sessões que pedem a mesma etapa ao mesmo tempo esperam um único cálculo
+        with self._trava:
+            trava_chave = self._travas_chave.setdefault(chave, threading.Lock())
+        with trava_chave:
+            with self._trava:
+                contadores = self.contadores.setdefault(nome, [0, 0, 0.0, 0.0])
+                if chave in self.cache:
+                    self.cache.move_to_end(chave)
+                    contadores[1] += 1
+                    valor = self.cache[chave]
+                    contexto['valores'][nome] = valor
+                    return valor
+
+            funcao, entradas, _ = self.estagios[nome]
+            argumentos = [self._valor(entrada, contexto) for entrada in entradas]
+            inicio = time.perf_counter()
+            valor = funcao(*argumentos)
+            duracao = time.perf_counter() - inicio
+
+            with self._trava:
+                contadores[0] += 1
+                contadores[2] += duracao
+                contadores[3] = duracao
+                self.cache[chave] = valor
+                self._descartar_antigas()
+        contexto['valores'][nome] = valor
+        return valor
+
+    # Remove as chaves usadas há mais tempo até o cache voltar ao tamanho, pulando as fixadas
+    def _descartar_antigas(self):
+        excesso = len(self.cache) - self.tamanho_cache
+        if excesso <= 0:
+            return
+        fixadas = set().union(*self.fixadas.values())
+        for chave in [chave for chave in self.cache if chave not in fixadas][:excesso]:
+            del self.cache[chave]
+
+    # Tempo e acertos de cache por etapa (para ver onde a cadeia gasta tempo)
+    def estatisticas(self):
+        with self._trava:
+            linhas = {nome: list(valores) for nome, valores in self.contadores.items()}
+        return pd.DataFrame.from_dict(linhas, orient='index', columns=['execucoes', 'acertos_cache', 'segundos_total', 'segundos_ultima']).rename_axis('etapa')
+
+    def limpar(self):
+        with self._trava:
+            self.cache.clear()
+
+
+# Conjuntos viram tuplas ordenadas e listas viram tuplas (para o resumo ser estável)
+def _normalizar(parametros):
+    normalizados = {}
+    for nome, valor in parametros.items():
+        if nome in PARAMETROS_CONJUNTO and valor is not None:
+            valor = tuple(sorted(set(valor)))
+        elif isinstance(valor, list):
+            valor = tuple(valor)
+        normalizados[nome] = valor
+    return normalizados
+
+
+def _resumo(objeto):
+    return hashlib.sha256(pickle.dumps(objeto, protocol=4)).hexdigest()
+
+
+# Cadeia compartilhada pelo processo (no Streamlit, por todas as sessões do servidor)
+PIPELINE = Pipeline()
+
+
+def executar(alvo, **parametros):
+    return PIPELINE.executar(alvo, **parametros)
+
+
+def estatisticas():
+    return PIPELINE.estatisticas()
+
+
+# --- Etapas ---
+
+# Tags, autores e primeira/última data de criação disponíveis para os filtros dos apps
+@estagio
+def opcoes(indice, indice_tempo):
+    return {'tags': indice.valores(indices.COLUNA_TAGS), 'autores': indice.valores(previsao.COLUNA_AUTOR), 'datas': indice_tempo.limites()}
+
+
+# Arquivos da origem com tamanho e data de modificação: muda quando uma exportação é trocada
+@estagio(volatil=True)
+def assinatura_origem(origem):
+    arquivos = ingestao.listar_exportacoes(origem)
+    return tuple((arquivo, os.stat(arquivo).st_size, os.stat(arquivo).st_mtime_ns) for arquivo in arquivos)
+
+
+# Tabela de issues só com as colunas usadas (e o arquivo de origem de cada issue), mensagens
+# agrupadas pela regra, ordenada pela criação. São lidos exatamente os arquivos da assinatura (a
+# chave da etapa), um por processo (ingestao.carregar_exportacoes); sem nenhum, o erro cita a origem
+@estagio
+def tabela(origem, assinatura_origem):
+    arquivos = [arquivo for arquivo, *_ in assinatura_origem]
+    df = ingestao.carregar_exportacoes(arquivos or origem, ingestao.COLUNAS_PREVISAO + [indices.COLUNA_TAGS, mensagens.COLUNA_MENSAGEM])
+    return mensagens.adicionar_regras(ingestao.ordenar_por_criacao(df))
+
+
+# Tabela somente leitura em arrays NumPy, para contagens por semana sem copiar o DataFrame
+@estagio
+def tabela_compartilhada(tabela):
+    return dados.TabelaIssues(tabela[ingestao.COLUNAS_PREVISAO])
+
+
+@estagio
+def indice(tabela):
+    return indices.IndiceBitmap(tabela)
+
+
+@estagio
+def indice_vida(tabela):
+    return indices.IndiceVida(tabela)
+
+
+@estagio
+def indice_tempo(tabela):
+    return indices.IndiceTempo(tabela['issue_creation_date'])
+
+
+# Janela do histórico usada nas médias: periodo = (primeiro dia, último dia), None = histórico completo.
+# A fatia (inicio, fim) de linhas sai de uma busca binária no índice de tempo.
+@estagio
+def fatia(indice_tempo, periodo):
+    return None if periodo is None else indice_tempo.fatia(periodo)
+
+
+# Semanas da janela (ou do histórico completo), base das médias semanais
+@estagio
+def semanas_historico(indice_tempo, periodo):
+    return indice_tempo.semanas(periodo)
+
+
+# Semanas da janela (dias cobertos / 7, indices.semanas_cobertas), divisor das médias semanais
+@estagio
+def semanas_cobertas(indice_tempo, periodo):
+    return indice_tempo.semanas_cobertas(periodo)
+
+
+# Bitmap das issues com as tags pedidas (sem tags: todas as issues)
+@estagio
+def bitmap_tags(indice, tags, modo_tags):
+    if not tags:
+        return indice.todas()
+    return indice.bitmap(indices.COLUNA_TAGS, tags, modo_tags)
+
+
+# Bitmap das issues selecionadas: tags, autores e projetos (None = todos)
+@estagio
+def bitmap_selecao(indice, bitmap_tags, autores, projetos):
+    bitmap = bitmap_tags
+    if autores is not None:
+        bitmap = bitmap & indice.bitmap(previsao.COLUNA_AUTOR, autores)
+    if projetos is not None:
+        bitmap = bitmap & indice.bitmap(previsao.COLUNA_PROJETO, projetos)
+    return bitmap
+
+
+# Taxas por autor das issues com as tags pedidas no histórico completo; não depende da seleção de
+# autores nem da janela. As médias dividem pelas semanas cobertas do histórico, como as da janela
+@estagio
+def taxas_por_autor(tabela, indice, bitmap_tags, indice_tempo):
+    return previsao.calcular_taxas(indice.selecionar(tabela, bitmap_tags), previsao.COLUNA_AUTOR, indice_tempo.semanas_cobertas())
+
+
+# Taxas por autor com as médias semanais só da janela; os totais continuam os do histórico completo
+# (as issues abertas hoje são o backlog inicial, qualquer que seja a data de criação)
+@estagio
+def taxas_por_autor_janela(tabela, indice, bitmap_tags, taxas_por_autor, fatia, semanas_cobertas):
+    return _medias_da_janela(taxas_por_autor, tabela, indice, bitmap_tags, fatia, semanas_cobertas)
+
+
+# Totais e médias semanais da seleção. Sem filtro de projeto, é a soma das taxas dos autores
+# (previsao.combinar_taxas); com filtro de projeto, as issues selecionadas são contadas.
+@estagio
+def taxas(tabela, indice, taxas_por_autor_janela, bitmap_selecao, indice_tempo, fatia, semanas_cobertas, autores, projetos):
+    if projetos is None:
+        return previsao.combinar_taxas(taxas_por_autor_janela, taxas_por_autor_janela.index if autores is None else autores)
+    selecao = indice.selecionar(tabela, bitmap_selecao)
+    taxas_selecao = previsao.calcular_taxas(selecao, previsao.COLUNA_AUTOR, indice_tempo.semanas_cobertas())
+    return _medias_da_janela(taxas_selecao, tabela, indice, bitmap_selecao, fatia, semanas_cobertas).sum()
+
+
+# Troca as médias semanais das taxas pelas das issues do bitmap criadas na fatia (só as linhas da
+# janela são lidas); sem fatia, as taxas do histórico completo
+def _medias_da_janela(taxas, tabela, indice, bitmap, fatia, semanas_cobertas):
+    if fatia is None:
+        return taxas
+    janela = previsao.calcular_taxas(indice.selecionar(tabela, bitmap, fatia), previsao.COLUNA_AUTOR, semanas_cobertas)
+    taxas = taxas.copy()
+    for coluna in ('media_abertos_por_semana', 'media_fechados_por_semana'):
+        taxas[coluna] = janela[coluna].reindex(taxas.index, fill_value=0.0)
+    return taxas
+
+
+# Issues por período de criação ('D', 'W' ou 'M') e status, com zero nos períodos sem issues
+# (um único histograma para todos os status, dados.histograma_por_status)
+@estagio
+def contagens_por_periodo(tabela_compartilhada, indice, bitmap_selecao, fatia, frequencia):
+    return tabela_compartilhada.contar_por_periodo(frequencia, indice.mascara(bitmap_selecao, fatia), fatia)
+
+
+# Issues abertas e fechadas por semana de criação (na janela, com todas as semanas da janela)
+@estagio
+def contagens_semanais(tabela_compartilhada, indice, bitmap_selecao, fatia, semanas_historico):
+    contagem = tabela_compartilhada.contar_por_periodo('W', indice.mascara(bitmap_selecao, fatia), fatia)
+    if fatia is not None:
+        contagem = contagem.reindex(semanas_historico, fill_value=0)
+    return pd.DataFrame({
+        'abertas': contagem.get(previsao.STATUS_ABERTO, 0),
+        'fechadas': contagem.get(previsao.STATUS_FECHADO, 0),
+    }, index=contagem.index)
+
+
+# Média semanal de novas issues (todos os status) por projeto, como nos primeiros apps
+# (issues sem data de criação não caem em nenhuma semana)
+@estagio
+def medias_novas_por_projeto(tabela, indice, bitmap_selecao, fatia, semanas_cobertas):
+    selecao = indice.selecionar(tabela, bitmap_selecao, fatia)
+    selecao = selecao[selecao['issue_creation_date'].notna()]
+    return selecao.groupby(previsao.COLUNA_PROJETO, observed=True).size() / semanas_cobertas
+
+
+# Média das simulações de novas issues por semana futura, somando os projetos
+# (a soma de processos de Poisson independentes é Poisson com a soma das médias)
+@estagio
+def projecao_novos(medias_novas_por_projeto, num_simulacoes, num_semanas, amostragem):
+    simulacoes = previsao.simular_poisson(float(medias_novas_por_projeto.sum()), num_simulacoes, num_semanas, amostragem=amostragem)
+    return simulacoes.mean(axis=0)
+
+
+# Médias das simulações independentes de novas abertas e de fechadas por semana futura
+@estagio
+def projecao_poisson(taxas, num_simulacoes, num_semanas, amostragem):
+    abertas = previsao.simular_poisson(float(taxas['media_abertos_por_semana']), num_simulacoes, num_semanas, amostragem=amostragem)
+    fechadas = previsao.simular_poisson(float(taxas['media_fechados_por_semana']), num_simulacoes, num_semanas, amostragem=amostragem)
+    return pd.DataFrame({'novas_abertas': abertas.mean(axis=0), 'fechadas': fechadas.mean(axis=0)},
+                        index=pd.RangeIndex(1, num_semanas + 1, name='semana'))
+
+
+# Projeção do backlog pela média semanal de fechamentos (previsao.simular_backlog)
+@estagio
+def projecao(taxas, num_simulacoes, num_semanas, amostragem):
+    return previsao.simular_backlog(int(taxas['issues_abertas']), float(taxas['media_abertos_por_semana']),
+                                    float(taxas['media_fechados_por_semana']), num_simulacoes, num_semanas,
+                                    amostragem=amostragem)
+
+
+# Varredura de cenários "e se" sobre as taxas da seleção: todos os multiplicadores e horizontes
+# numa única simulação com números aleatórios comuns (previsao.simular_cenarios)
+@estagio
+def cenarios(taxas, multiplicadores_abertas, multiplicadores_fechadas, horizontes, num_simulacoes, amostragem):
+    return previsao.simular_cenarios(int(taxas['issues_abertas']), float(taxas['media_abertos_por_semana']),
+                                     float(taxas['media_fechados_por_semana']), multiplicadores_abertas,
+                                     multiplicadores_fechadas, horizontes, num_simulacoes, amostragem=amostragem)
+
+
+# Projeção do backlog reamostrando em blocos as semanas históricas de (abertas, fechadas)
+@estagio
+def projecao_bootstrap(taxas, contagens_semanais, num_simulacoes, num_semanas, semanas_por_bloco):
+    return previsao.simular_backlog_bootstrap(int(taxas['issues_abertas']), contagens_semanais['abertas'].to_numpy(),
+                                              contagens_semanais['fechadas'].to_numpy(), num_simulacoes, num_semanas,
+                                              semanas_por_bloco)
+
+
+# Idade (em dias) das issues abertas hoje na seleção, com a mesma definição de aberta da curva de
+# sobrevivência (indices.abertas_vida)
+@estagio
+def idades_abertas(tabela, indice, indice_vida, bitmap_selecao):
+    selecao = indice.selecionar(tabela, bitmap_selecao)
+    return indice_vida.idades(selecao.loc[indices.abertas_vida(selecao), 'issue_creation_date'].to_numpy())
+
+
+# Média semanal de issues criadas na seleção, com qualquer status: a chegada de novas issues no modelo
+# de sobrevivência, que fecha parte delas pela curva (a média das que continuam OPEN já desconta os
+# fechamentos e os contaria duas vezes)
+@estagio
+def media_criadas_por_semana(tabela, indice, bitmap_selecao, fatia, semanas_cobertas):
+    selecao = indice.selecionar(tabela, bitmap_selecao, fatia)
+    return int(selecao['issue_creation_date'].notna().sum()) / semanas_cobertas
+
+
+# Projeção do backlog com fechamentos pela curva de sobrevivência
+@estagio
+def projecao_sobrevivencia(indice_vida, idades_abertas, media_criadas_por_semana, num_simulacoes, num_semanas):
+    return previsao.simular_backlog_sobrevivencia(indice_vida, idades_abertas, media_criadas_por_semana,
+                                                  num_simulacoes, num_semanas)
+
+
+# Média semanal de novas issues abertas por regra na seleção
+@estagio
+def medias_por_regra(tabela, indice, bitmap_selecao, fatia, semanas_historico, semanas_cobertas):
+    abertas_por_semana = mensagens.contar_regras_por_semana(indice.selecionar(tabela, bitmap_selecao, fatia), semanas=semanas_historico)
+    return (abertas_por_semana.sum(axis=1) / semanas_cobertas).sort_values(ascending=False)
+
+
+# --- Etapas do banco embutido (banco.py) ---
+
+# Arquivo do banco com tamanho e data de modificação: muda quando o banco é reimportado
+@estagio(volatil=True)
+def assinatura_banco(caminho_banco):
+    return (caminho_banco, os.stat(caminho_banco).st_size, os.stat(caminho_banco).st_mtime_ns)
+
+
+# Banco aberto por arquivo: quando o banco é reimportado o anterior é fechado antes do novo conectar
+# (o DuckDB reaproveita o banco já aberto no mesmo caminho e leria o arquivo substituído)
+_bancos_abertos = {}
+_trava_bancos = threading.Lock()
+
+
+@estagio
+def banco_issues(caminho_banco, assinatura_banco):
+    novo = banco.BancoIssues(caminho_banco)
+    with _trava_bancos:
+        anterior = _bancos_abertos.get(caminho_banco)
+        _bancos_abertos[caminho_banco] = novo
+    if anterior is not None:
+        anterior.fechar()
+    return novo
+
+
+@estagio(registro=ESTAGIOS_BANCO, nome='opcoes')
+def opcoes_banco(banco_issues):
+    return {'tags': banco_issues.valores(indices.COLUNA_TAGS), 'autores': banco_issues.valores(previsao.COLUNA_AUTOR),
+            'datas': banco_issues.limites()}
+
+
+@estagio(registro=ESTAGIOS_BANCO, nome='taxas')
+def taxas_banco(banco_issues, tags, modo_tags, autores, projetos, periodo):
+    return banco_issues.taxas(autores, projetos, tags, modo_tags, periodo)
+
+
+@estagio(registro=ESTAGIOS_BANCO, nome='contagens_semanais')
+def contagens_semanais_banco(banco_issues, tags, modo_tags, autores, projetos, periodo):
+    return banco_issues.contagens_semanais(autores, projetos, tags, modo_tags, periodo)
+
+
+@estagio(registro=ESTAGIOS_BANCO, nome='medias_por_regra')
+def medias_por_regra_banco(banco_issues, tags, modo_tags, autores, projetos, periodo):
+    return banco_issues.medias_por_regra(autores, projetos, tags, modo_tags, periodo)
+
+
+@estagio(registro=ESTAGIOS_BANCO, nome='indice_vida')
+def indice_vida_banco(banco_issues):
+    return banco_issues.indice_vida()
+
+
+@estagio(registro=ESTAGIOS_BANCO, nome='media_criadas_por_semana')
+def media_criadas_por_semana_banco(banco_issues, tags, modo_tags, autores, projetos, periodo):
+    return banco_issues.media_criadas_por_semana(autores, projetos, tags, modo_tags, periodo)
+
+
+@estagio(registro=ESTAGIOS_BANCO, nome='idades_abertas')
+def idades_abertas_banco(banco_issues, indice_vida, tags, modo_tags, autores, projetos):
+    return indice_vida.idades(banco_issues.criacao_abertas(autores, projetos, tags, modo_tags))
+
+
+# Cadeia sobre o banco embutido: as etapas de ESTAGIOS_BANCO substituem as de mesmo nome
+PIPELINE_BANCO = Pipeline({**ESTAGIOS, **ESTAGIOS_BANCO})
@@ -0,0 +1,600 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+# Colunas e status usados pelos apps de projeção
+COLUNA_PROJETO = 'Projects - Project UUID__kee'
+COLUNA_AUTOR = 'author_login'
+STATUS_ABERTO = 'OPEN'
+STATUS_FECHADO = 'CLOSED'
+
+
+# Calcula, para cada valor da coluna (autor ou projeto), o total de issues abertas e fechadas
+# e a média semanal de cada status.
+# A média usa sempre o intervalo de semanas do histórico completo, assim a taxa de qualquer
+# seleção é exatamente a soma das taxas de cada autor/projeto selecionado.
+# Ao calcular as taxas de um subconjunto das issues (por exemplo, filtrado por tag), informe
+# num_semanas_historico do histórico completo para manter a mesma base semanal.
+def calcular_taxas(df, coluna, num_semanas_historico=None):
+    contagem = df.groupby([coluna, 'status'], observed=True).size()
+    if num_semanas_historico is None:
+        num_semanas_historico = contar_semanas(df)
+    return _taxas_da_contagem(contagem, num_semanas_historico)
+
+
+# Mesmo cálculo de calcular_taxas, mas consumindo a tabela em lotes (por exemplo, vindos de
+# ingestao.ler_exportacoes_em_lotes) para várias colunas numa única passada.
+# Só as contagens por (valor, status) e as datas extremas ficam em memória.
+def calcular_taxas_em_lotes(lotes, colunas=(COLUNA_AUTOR, COLUNA_PROJETO)):
+    contagens = {coluna: None for coluna in colunas}
+    inicio, fim = None, None
+    for lote in lotes:
+        for coluna in colunas:
+            parcial = lote.groupby([coluna, 'status'], observed=True).size()
+            contagens[coluna] = parcial if contagens[coluna] is None else contagens[coluna].add(parcial, fill_value=0)
+        datas = lote['issue_creation_date'].dropna()
+        if datas.empty:
+            continue
+        inicio = datas.min() if inicio is None else min(inicio, datas.min())
+        fim = datas.max() if fim is None else max(fim, datas.max())
+    if inicio is None:
+        raise ValueError("Nenhuma issue com data de criação nos lotes")
+    semanas = _contar_semanas(inicio, fim)
+    return {coluna: _taxas_da_contagem(contagem.astype(np.int64), semanas) for coluna, contagem in contagens.items()}
+
+
+# Semanas do histórico de issues, da primeira à última data de criação
+def semanas_do_historico(df):
+    return pd.period_range(df['issue_creation_date'].min().to_period('W'),
+                           df['issue_creation_date'].max().to_period('W'), freq='W')
+
+
+# Número de semanas do histórico de issues
+def contar_semanas(df):
+    return _contar_semanas(df['issue_creation_date'].min(), df['issue_creation_date'].max())
+
+
+def _contar_semanas(inicio, fim):
+    return len(pd.period_range(inicio.to_period('W'), fim.to_period('W'), freq='W'))
+
+
+# Monta a tabela de taxas a partir das contagens por (valor, status)
+def _taxas_da_contagem(contagem, num_semanas_historico):
+    contagem = contagem.unstack(fill_value=0)
+    taxas = pd.DataFrame(index=contagem.index)
+    taxas['issues_abertas'] = contagem.get(STATUS_ABERTO, 0)
+    taxas['issues_fechadas'] = contagem.get(STATUS_FECHADO, 0)
+    taxas['media_abertos_por_semana'] = taxas['issues_abertas'] / num_semanas_historico
+    taxas['media_fechados_por_semana'] = taxas['issues_fechadas'] / num_semanas_historico
+    return taxas
+
+
+# Combina as taxas pré-calculadas dos itens selecionados somando suas linhas.
+# Como cada autor contribui de forma independente, a soma de processos de Poisson
+# continua sendo Poisson com a soma das taxas: não é preciso refiltrar o DataFrame.
+# Itens selecionados sem issues na tabela de taxas contam como zero.
+def combinar_taxas(taxas, selecionados):
+    return taxas.reindex(list(selecionados), fill_value=0).sum()
+
+
+# Métodos de amostragem disponíveis para as simulações:
+# - 'aleatoria': sorteios pseudoaleatórios comuns (np.random.poisson)
+# - 'antitetica': pares de uniformes u e 1 - u, que produzem sorteios negativamente correlacionados
+# - 'estratificada': cada semana recebe exatamente uma uniforme em cada estrato [i/n, (i+1)/n)
+# - 'quasi': pontos de baixa discrepância (sequência de Kronecker com deslocamento aleatório)
+# Nos três últimos as uniformes são convertidas em contagens pela inversa da CDF de Poisson.
+METODOS_AMOSTRAGEM = ('aleatoria', 'antitetica', 'estratificada', 'quasi')
+
+
+# Primeiros n números primos (usados como base da sequência de Kronecker)
+def _primos(n):
+    primos = []
+    candidato = 2
+    while len(primos) < n:
+        if all(candidato % p for p in primos if p * p <= candidato):
+            primos.append(candidato)
+        candidato += 1
+    return np.array(primos)
+
+
+# Gera uma matriz (n, dimensao) de uniformes em [0, 1) com o método de amostragem escolhido
+def gerar_uniformes(metodo, n, dimensao, rng):
+    if metodo == 'aleatoria':
+        return rng.random((n, dimensao))
+    if metodo == 'antitetica':
+        u = rng.random(((n + 1) // 2, dimensao))
+        return np.concatenate([u, 1 - u])[:n]
+    if metodo == 'estratificada':
+        estratos = rng.permuted(np.tile(np.arange(n), (dimensao, 1)), axis=1).T
+        return (estratos + rng.random((n, dimensao))) / n
+    if metodo == 'quasi':
+        passo = np.sqrt(_primos(dimensao)) % 1
+        deslocamento = rng.random(dimensao)
+        return (deslocamento + np.arange(1, n + 1)[:, None] * passo) % 1
+    raise ValueError(f"Método de amostragem desconhecido: {metodo}")
+
+
+# Inversa da CDF de Poisson: converte uniformes em contagens com a média informada
+def poisson_inversa(media, u):
+    if media <= 0:
+        return np.zeros(np.shape(u), dtype=np.int32)
+    return np.searchsorted(_cdf_poisson(media), u, side='right').astype(np.int32)
+
+
+# Inversa da CDF de Poisson para várias médias sobre as mesmas uniformes (números aleatórios comuns).
+# As uniformes são ordenadas uma vez; para cada média, basta localizar os pontos da CDF (poucos)
+# entre as uniformes ordenadas e devolver as contagens às posições originais.
+# Retorna um array (len(medias),) + u.shape com as mesmas contagens de poisson_inversa.
+def poisson_inversa_comum(medias, u):
+    u = np.asarray(u)
+    ordem = np.argsort(u, axis=None)
+    ordenadas = u.ravel()[ordem]
+    contagens = np.zeros((len(medias), u.size), dtype=np.int32)
+    for i, media in enumerate(medias):
+        if media <= 0:
+            continue
+        # A contagem da uniforme na posição j é o número de pontos da CDF <= a ela
+        fronteiras = np.searchsorted(ordenadas, _cdf_poisson(media), side='left')
+        contagens[i, ordem] = np.cumsum(np.bincount(fronteiras, minlength=u.size + 1)[:-1], dtype=np.int32)
+    return contagens.reshape((len(medias),) + u.shape)
+
+
+def _cdf_poisson(media):
+    limite = int(media + 12 * np.sqrt(media) + 12)
+    k = np.arange(limite + 1)
+    log_fatorial = np.concatenate([[0.0], np.cumsum(np.log(k[1:]))])
+    cdf = np.cumsum(np.exp(k * np.log(media) - media - log_fatorial))
+    cdf[-1] = 1.0
+    return cdf
+
+
+# Sorteia n caminhos de contagens semanais de Poisson com o método de amostragem escolhido
+def sortear_poisson(media_por_semana, n, num_semanas, rng, amostragem='aleatoria'):
+    if amostragem == 'aleatoria':
+        return rng.poisson(media_por_semana, (n, num_semanas))
+    return poisson_inversa(media_por_semana, gerar_uniformes(amostragem, n, num_semanas, rng))
+
+
+# Simulação de Monte Carlo vetorizada: gera todas as simulações de uma vez,
+# uma linha por simulação e uma coluna por semana futura
+def simular_poisson(media_por_semana, num_simulacoes, num_semanas, rng=None, amostragem='aleatoria'):
+    rng = np.random.default_rng() if rng is None else rng
+    return sortear_poisson(media_por_semana, num_simulacoes, num_semanas, rng, amostragem)
+
+
+# Simulação do backlog (issues em aberto) caminho a caminho.
+# Em cada semana: backlog = backlog anterior + novas abertas - fechadas, sendo que só é possível
+# fechar issues que estão abertas (o backlog nunca fica negativo).
+# Essa recursão é resolvida sem laço por semana: com S = issues_abertas + soma acumulada de
+# (abertas - fechadas), o backlog é S - min(0, mínimo acumulado de S).
+# As simulações são processadas em blocos de int32 dimensionados por memoria_max_bytes, então
+# 1 milhão de caminhos x 52 semanas roda com memória fixa. Apenas estatísticas por semana são
+# acumuladas: soma, soma dos quadrados e um histograma para os percentis.
+def simular_backlog(issues_abertas, media_abertos_por_semana, media_fechados_por_semana, num_simulacoes,
+                    num_semanas, rng=None, percentis=(5, 50, 95), memoria_max_bytes=64 * 2**20,
+                    amostragem='aleatoria'):
+    rng = np.random.default_rng() if rng is None else rng
+    # Por caminho: sorteio temporário (int64 ou as uniformes float64 de abertas e fechadas) + dois arrays
+    # int32 + os códigos do histograma (int64)
+    bytes_por_caminho = (8 + 4 + 4 + 16) * num_semanas if amostragem == 'aleatoria' else (16 + 4 + 4 + 16) * num_semanas
+
+    estado = _novo_estado_backlog(issues_abertas, num_semanas)
+    restantes = num_simulacoes
+    while restantes > 0:
+        n = _tamanho_bloco(estado, restantes, memoria_max_bytes, bytes_por_caminho)
+        restantes -= n
+        _acumular_bloco_backlog(estado, media_abertos_por_semana, media_fechados_por_semana, n, rng, amostragem)
+    return _resumir_backlog(estado, percentis)
+
+
+# Simulação do backlog em que os fechamentos vêm da curva de sobrevivência das issues
+# (indices.IndiceVida) em vez de uma média semanal de fechamentos.
+# Cada issue aberta hoje, com a idade em idades_abertas (dias), fecha em uma das próximas semanas
+# com a probabilidade condicional à idade; cada nova issue (Poisson com media_criadas_por_semana, a
+# média de todas as issues criadas, e não só das que continuam abertas) fecha conforme a curva a
+# partir da semana em que foi aberta. Como cada fechamento corresponde
+# a uma issue real, o backlog nunca fica negativo.
+def simular_backlog_sobrevivencia(indice_vida, idades_abertas, media_criadas_por_semana, num_simulacoes,
+                                  num_semanas, rng=None, percentis=(5, 50, 95), memoria_max_bytes=64 * 2**20):
+    rng = np.random.default_rng() if rng is None else rng
+    probabilidades = _probabilidades_sobrevivencia(indice_vida, idades_abertas, num_semanas)
+    num_faixas = len(probabilidades[0])
+    # Por caminho: sorteios multinomiais (int64) das faixas de idade e das novas issues + índices +
+    # os códigos do histograma (int64)
+    bytes_por_caminho = 8 * (num_semanas + 1) * (num_faixas + 2 * num_semanas) + 32 * num_semanas
+
+    estado = _novo_estado_backlog(len(idades_abertas), num_semanas)
+    restantes = num_simulacoes
+    while restantes > 0:
+        n = _tamanho_bloco(estado, restantes, memoria_max_bytes, bytes_por_caminho)
+        restantes -= n
+        abertos, fechados = _sortear_sobrevivencia(probabilidades, media_criadas_por_semana, n, num_semanas, rng)
+        _acumular_caminhos_backlog(estado, abertos, fechados)
+    return _resumir_backlog(estado, percentis)
+
+
+# Simulação do backlog reamostrando semanas do histórico em vez de sortear contagens de Poisson.
+# As contagens semanais de (abertas, fechadas) do histórico são reamostradas aos pares em blocos de
+# semanas_por_bloco semanas consecutivas (bootstrap de blocos móveis): semanas com picos (ex.: uma
+# nova análise que registra muitas issues de uma vez) e a correlação entre semanas vizinhas entram
+# na projeção como aconteceram. O backlog segue a mesma recursão de simular_backlog.
+def simular_backlog_bootstrap(issues_abertas, abertas_por_semana, fechadas_por_semana, num_simulacoes, num_semanas,
+                              semanas_por_bloco=4, rng=None, percentis=(5, 50, 95), memoria_max_bytes=64 * 2**20):
+    rng = np.random.default_rng() if rng is None else rng
+    historico = _historico_blocos(abertas_por_semana, fechadas_por_semana, semanas_por_bloco)
+    # Por caminho: inícios e índices dos blocos (int64) + dois arrays int32 + os códigos do histograma (int64)
+    bytes_por_caminho = (8 + 4 + 4 + 16) * num_semanas
+
+    estado = _novo_estado_backlog(issues_abertas, num_semanas)
+    restantes = num_simulacoes
+    while restantes > 0:
+        n = _tamanho_bloco(estado, restantes, memoria_max_bytes, bytes_por_caminho)
+        restantes -= n
+        _acumular_caminhos_backlog(estado, *_sortear_blocos(historico, n, num_semanas, rng))
+    return _resumir_backlog(estado, percentis)
+
+
+# Contagens históricas (int32) e deslocamentos de um bloco; o bloco não passa do tamanho do histórico
+def _historico_blocos(abertas_por_semana, fechadas_por_semana, semanas_por_bloco):
+    abertas = np.asarray(abertas_por_semana, dtype=np.int32)
+    fechadas = np.asarray(fechadas_por_semana, dtype=np.int32)
+    if len(abertas) == 0:
+        abertas = fechadas = np.zeros(1, dtype=np.int32)
+    deslocamentos = np.arange(max(1, min(semanas_por_bloco, len(abertas))))
+    return abertas, fechadas, deslocamentos
+
+
+# Sorteia n caminhos de (novas abertas, fechadas) por semana: um início por bloco, somado aos
+# deslocamentos, dá a matriz (n, semanas) de semanas do histórico, indexada de uma vez
+def _sortear_blocos(historico, n, num_semanas, rng):
+    abertas, fechadas, deslocamentos = historico
+    semanas_por_bloco = len(deslocamentos)
+    num_blocos = -(-num_semanas // semanas_por_bloco)
+    inicios = rng.integers(0, len(abertas) - semanas_por_bloco + 1, (n, num_blocos))
+    semanas = (inicios[:, :, None] + deslocamentos).reshape(n, num_blocos * semanas_por_bloco)[:, :num_semanas]
+    return abertas[semanas], fechadas[semanas]
+
+
+# Probabilidades de fechamento por semana futura: issues abertas agrupadas por idade em semanas
+# (quantidade e probabilidades de cada faixa) e novas issues (idade zero)
+def _probabilidades_sobrevivencia(indice_vida, idades_abertas, num_semanas):
+    faixas, quantidades = np.unique(np.floor(np.asarray(idades_abertas, dtype=np.float64) / 7), return_counts=True)
+    probabilidades_faixas = indice_vida.probabilidades_fechamento(7 * faixas + 3.5, num_semanas)
+    probabilidades_novas = indice_vida.probabilidades_fechamento([0.0], num_semanas)[0]
+    return quantidades, probabilidades_faixas, probabilidades_novas
+
+
+# Sorteia n caminhos de (novas abertas, fechadas) por semana com fechamentos da curva de sobrevivência
+def _sortear_sobrevivencia(probabilidades, media_criadas_por_semana, n, num_semanas, rng):
+    quantidades, probabilidades_faixas, probabilidades_novas = probabilidades
+    fechados = np.zeros((n, num_semanas), dtype=np.int64)
+    # Backlog atual: uma multinomial por faixa de idade, todas sorteadas de uma vez
+    if len(quantidades):
+        fechados += rng.multinomial(np.broadcast_to(quantidades, (n, len(quantidades))),
+                                    probabilidades_faixas)[:, :, :num_semanas].sum(axis=1)
+
+    # Novas issues: a semana de abertura + o atraso sorteado dá a semana do fechamento
+    abertos = rng.poisson(media_criadas_por_semana, (n, num_semanas))
+    atrasos = rng.multinomial(abertos, probabilidades_novas)[:, :, :num_semanas]
+    semana_fechamento = np.arange(num_semanas)[:, None] + np.arange(num_semanas)[None, :]
+    dentro = semana_fechamento < num_semanas
+    codigos = np.arange(n)[:, None] * num_semanas + semana_fechamento[dentro][None, :]
+    fechados += np.bincount(codigos.ravel(), weights=atrasos[:, dentro].ravel(),
+                            minlength=n * num_semanas).reshape(n, num_semanas).astype(np.int64)
+    return abertos.astype(np.int32), fechados.astype(np.int32)
+
+
+# Lotes necessários para estimar o erro padrão pela variância entre as médias dos lotes
+MIN_LOTES_ERRO_PADRAO = 10
+
+
+# Estatísticas acumuladas das simulações de backlog já executadas
+def _novo_estado_backlog(issues_abertas, num_semanas):
+    return {
+        'issues_abertas': issues_abertas,
+        'num_simulacoes': 0,
+        'soma_abertos': np.zeros(num_semanas, dtype=np.int64),
+        'soma_backlog': np.zeros(num_semanas, dtype=np.int64),
+        'soma_quadrados': np.zeros(num_semanas, dtype=np.float64),
+        'histograma': np.zeros((num_semanas, 1), dtype=np.int64),
+        'base_histograma': None,
+        # Médias por lote (cada chamada de _acumular_caminhos_backlog), para o erro padrão
+        'num_lotes': 0,
+        'soma_medias_lote': np.zeros(num_semanas, dtype=np.float64),
+        'soma_quadrados_medias_lote': np.zeros(num_semanas, dtype=np.float64),
+    }
+
+
+# Caminhos do próximo bloco: o orçamento de memória menos o histograma dos percentis (e a cópia que
+# sai do bincount), dividido pelos bytes por caminho; ao menos um caminho
+def _tamanho_bloco(estado, restantes, memoria_max_bytes, bytes_por_caminho):
+    livre = memoria_max_bytes - 2 * estado['histograma'].nbytes
+    return max(1, min(restantes, livre // bytes_por_caminho))
+
+
+# Simula um bloco de n caminhos e soma suas estatísticas ao estado
+# Nos métodos com redução de variância, abertas e fechadas usam dimensões distintas do mesmo ponto.
+def _acumular_bloco_backlog(estado, media_abertos_por_semana, media_fechados_por_semana, n, rng,
+                            amostragem='aleatoria'):
+    num_semanas = len(estado['soma_backlog'])
+    if amostragem == 'aleatoria':
+        abertos = rng.poisson(media_abertos_por_semana, (n, num_semanas)).astype(np.int32)
+        fechados = rng.poisson(media_fechados_por_semana, (n, num_semanas)).astype(np.int32)
+    else:
+        u = gerar_uniformes(amostragem, n, 2 * num_semanas, rng)
+        abertos = poisson_inversa(media_abertos_por_semana, u[:, :num_semanas])
+        fechados = poisson_inversa(media_fechados_por_semana, u[:, num_semanas:])
+    _acumular_caminhos_backlog(estado, abertos, fechados)
+
+
+# Soma ao estado as estatísticas de um bloco de caminhos de abertas/fechadas já sorteados.
+# Os dois arrays são reaproveitados (e sobrescritos) como área de trabalho.
+def _acumular_caminhos_backlog(estado, abertos, fechados):
+    estado['num_simulacoes'] += abertos.shape[0]
+    estado['soma_abertos'] += abertos.sum(axis=0, dtype=np.int64)
+
+    # Saldo acumulado S (reaproveitando o array de abertas)
+    np.subtract(abertos, fechados, out=abertos)
+    np.cumsum(abertos, axis=1, out=abertos)
+    abertos += estado['issues_abertas']
+    # Mínimo acumulado de S, limitado a zero (reaproveitando o array de fechadas)
+    np.minimum.accumulate(abertos, axis=1, out=fechados)
+    np.minimum(fechados, 0, out=fechados)
+    backlog = np.subtract(abertos, fechados, out=abertos)
+
+    soma_lote = backlog.sum(axis=0, dtype=np.int64)
+    estado['soma_backlog'] += soma_lote
+    media_lote = soma_lote / backlog.shape[0]
+    estado['num_lotes'] += 1
+    estado['soma_medias_lote'] += media_lote
+    estado['soma_quadrados_medias_lote'] += media_lote ** 2
+    estado['soma_quadrados'] += np.einsum('ij,ij->j', backlog, backlog, dtype=np.float64)
+
+    # Histograma por semana a partir do menor backlog da semana: a largura é a dispersão, não o backlog
+    estado['histograma'], estado['base_histograma'] = _acumular_histograma(estado['histograma'], estado['base_histograma'], backlog.T)
+
+
+# Erro padrão de cada média semanal do backlog pelas médias dos lotes (batch means).
+# Cada lote tem um sorteio próprio do método de amostragem e é independente dos outros, então a
+# variância entre as médias dos lotes já inclui a correlação entre os caminhos de um mesmo lote
+# (pares antitéticos, estratos, pontos da sequência quasi): o erro cai com a redução de variância.
+# Supõe lotes do mesmo tamanho (como na SimulacaoProgressiva); com poucos lotes, o erro é infinito.
+def _erro_padrao_backlog(estado):
+    k = estado['num_lotes']
+    if k < MIN_LOTES_ERRO_PADRAO:
+        return np.full(len(estado['soma_backlog']), np.inf)
+    media = estado['soma_medias_lote'] / k
+    variancia = np.maximum(estado['soma_quadrados_medias_lote'] - k * media ** 2, 0) / (k - 1)
+    return np.sqrt(variancia / k)
+
+
+# Converte o estado acumulado na tabela de projeção por semana
+def _resumir_backlog(estado, percentis=(5, 50, 95)):
+    num_simulacoes = estado['num_simulacoes']
+    num_semanas = len(estado['soma_backlog'])
+    media_abertos = estado['soma_abertos'] / num_simulacoes
+    media_backlog = estado['soma_backlog'] / num_simulacoes
+    variancia = np.maximum(estado['soma_quadrados'] / num_simulacoes - media_backlog ** 2, 0)
+    # Fechamentos efetivos: o que entrou menos o quanto o backlog cresceu na semana
+    media_fechados = media_abertos - np.diff(media_backlog, prepend=estado['issues_abertas'])
+
+    resultado = pd.DataFrame({
+        'novas_abertas': media_abertos,
+        'fechadas': media_fechados,
+        'backlog_medio': media_backlog,
+        'backlog_desvio': np.sqrt(variancia),
+    }, index=pd.RangeIndex(1, num_semanas + 1, name='semana'))
+    acumulado = np.cumsum(estado['histograma'], axis=1)
+    for p in percentis:
+        alvo = np.ceil(p / 100 * num_simulacoes)
+        resultado[f'backlog_p{p}'] = estado['base_histograma'] + (acumulado >= max(alvo, 1)).argmax(axis=1)
+    return resultado
+
+
+# Varredura de cenários "e se": multiplicadores sobre as taxas de abertura e de fechamento
+# (ex.: 1.2 = a equipe fecha 20% mais issues por semana) em vários horizontes de uma vez.
+# Todos os cenários usam as mesmas uniformes (números aleatórios comuns), convertidas em contagens
+# pela inversa da CDF de Poisson: só há uma conversão por multiplicador de abertura e uma por
+# multiplicador de fechamento, e o backlog de todas as combinações sai de uma única operação
+# vetorizada (abertas acumuladas x fechadas acumuladas, por broadcasting). Com os mesmos sorteios,
+# a diferença entre cenários tem variância bem menor que a de simulações independentes.
+# O cenário base (1, 1) é sempre simulado, para a coluna diferenca_base e seu erro padrão.
+# Retorna uma linha por (mult_abertas, mult_fechadas, horizonte).
+def simular_cenarios(issues_abertas, media_abertos_por_semana, media_fechados_por_semana, multiplicadores_abertas,
+                     multiplicadores_fechadas, horizontes, num_simulacoes, rng=None, percentis=(5, 50, 95),
+                     memoria_max_bytes=64 * 2**20, amostragem='aleatoria'):
+    rng = np.random.default_rng() if rng is None else rng
+    mult_abertas = np.unique(np.append(np.asarray(multiplicadores_abertas, dtype=np.float64), 1.0))
+    mult_fechadas = np.unique(np.append(np.asarray(multiplicadores_fechadas, dtype=np.float64), 1.0))
+    horizontes = np.unique(np.asarray(horizontes, dtype=np.int64))
+    num_semanas = int(horizontes[-1])
+    colunas = horizontes - 1
+    num_a, num_f = len(mult_abertas), len(mult_fechadas)
+    num_linhas = num_a * num_f * len(horizontes)
+    # Por caminho: uniformes (float64), acumulados por multiplicador (int32) e, por cenário, saldo e
+    # mínimo (int32), backlog e diferença nos horizontes (int32) e os códigos do histograma (int64)
+    bytes_por_caminho = 16 * num_semanas + 4 * num_semanas * (num_a + num_f) + 4 * num_a * num_f * (2 + 4 * len(horizontes))
+    tamanho_bloco = max(1, min(num_simulacoes, memoria_max_bytes // bytes_por_caminho))
+    base_abertas, base_fechadas = np.searchsorted(mult_abertas, 1.0), np.searchsorted(mult_fechadas, 1.0)
+
+    # Cada bloco é reduzido às somas e ao histograma de cada (cenário, horizonte) antes do próximo,
+    # então a memória não cresce com num_simulacoes
+    soma_abertas = np.zeros((num_a, len(horizontes)), dtype=np.int64)
+    soma = np.zeros(num_linhas, dtype=np.float64)
+    soma_quadrados = np.zeros(num_linhas, dtype=np.float64)
+    soma_diferenca = np.zeros(num_linhas, dtype=np.float64)
+    soma_quadrados_diferenca = np.zeros(num_linhas, dtype=np.float64)
+    reduziram = np.zeros(num_linhas, dtype=np.int64)
+    histograma, base_histograma = np.zeros((num_linhas, 1), dtype=np.int64), None
+    restantes = num_simulacoes
+    while restantes > 0:
+        n = min(tamanho_bloco, restantes)
+        restantes -= n
+        u = gerar_uniformes(amostragem, n, 2 * num_semanas, rng)
+        # (multiplicador, semana, caminho): cada semana é um vetor contíguo de caminhos
+        abertas = np.cumsum(poisson_inversa_comum(media_abertos_por_semana * mult_abertas, u[:, :num_semanas].T), axis=1, dtype=np.int32)
+        fechadas = np.cumsum(poisson_inversa_comum(media_fechados_por_semana * mult_fechadas, u[:, num_semanas:].T), axis=1, dtype=np.int32)
+        soma_abertas += abertas[:, colunas].sum(axis=2, dtype=np.int64)
+        # Mesma recursão de _acumular_caminhos_backlog (backlog = S - min(0, mínimo acumulado de S)) para
+        # todas as combinações (abertas, fechadas, caminho) de uma vez, semana a semana: cada passo é
+        # uma operação sobre todos os cenários e só os horizontes pedidos são guardados
+        bloco = np.empty((num_a, num_f, len(horizontes), n), dtype=np.int32)
+        saldo = np.empty((num_a, num_f, n), dtype=np.int32)
+        minimo = np.zeros((num_a, num_f, n), dtype=np.int32)
+        for semana in range(num_semanas):
+            np.subtract(abertas[:, None, semana], fechadas[None, :, semana], out=saldo)
+            saldo += np.int32(issues_abertas)
+            np.minimum(minimo, saldo, out=minimo)
+            posicao = np.searchsorted(colunas, semana)
+            if posicao < len(colunas) and colunas[posicao] == semana:
+                np.subtract(saldo, minimo, out=bloco[:, :, posicao])
+
+        backlog = bloco.reshape(num_linhas, n)
+        diferenca = (bloco - bloco[base_abertas, base_fechadas]).reshape(num_linhas, n)
+        soma += backlog.sum(axis=1, dtype=np.int64)
+        soma_quadrados += np.einsum('ij,ij->i', backlog, backlog, dtype=np.float64)
+        soma_diferenca += diferenca.sum(axis=1, dtype=np.int64)
+        soma_quadrados_diferenca += np.einsum('ij,ij->i', diferenca, diferenca, dtype=np.float64)
+        reduziram += (backlog < issues_abertas).sum(axis=1)
+        histograma, base_histograma = _acumular_histograma(histograma, base_histograma, backlog)
+
+    forma = (num_a, num_f, len(horizontes))
+    media_backlog = (soma / num_simulacoes).reshape(forma)
+    media_diferenca = soma_diferenca / num_simulacoes
+    resultado = {
+        'backlog_medio': media_backlog,
+        'backlog_desvio': np.sqrt(np.maximum(soma_quadrados / num_simulacoes - (soma / num_simulacoes) ** 2, 0)).reshape(forma),
+    }
+    acumulado = np.cumsum(histograma, axis=1)
+    for p in percentis:
+        resultado[f'backlog_p{p}'] = (base_histograma + (acumulado >= max(np.ceil(p / 100 * num_simulacoes), 1)).argmax(axis=1)).reshape(forma)
+    resultado['prob_reduzir'] = (reduziram / num_simulacoes).reshape(forma)
+    # Fechamentos efetivos acumulados: o que havia + o que entrou - o que ficou aberto
+    resultado['fechadas_acumuladas'] = issues_abertas + (soma_abertas / num_simulacoes)[:, None, :] - media_backlog
+    resultado['diferenca_base'] = media_diferenca.reshape(forma)
+    desvio_diferenca = np.sqrt(np.maximum(soma_quadrados_diferenca / num_simulacoes - media_diferenca ** 2, 0))
+    resultado['erro_padrao_diferenca'] = (desvio_diferenca / np.sqrt(num_simulacoes)).reshape(forma)
+
+    indice = pd.MultiIndex.from_product([mult_abertas, mult_fechadas, horizontes], names=['mult_abertas', 'mult_fechadas', 'horizonte'])
+    cenarios = pd.DataFrame({nome: np.broadcast_to(valores, forma).ravel()
+                             for nome, valores in resultado.items()}, index=indice)
+    pedidos = (cenarios.index.get_level_values('mult_abertas').isin(np.asarray(multiplicadores_abertas, dtype=np.float64))
+               & cenarios.index.get_level_values('mult_fechadas').isin(np.asarray(multiplicadores_fechadas, dtype=np.float64)))
+    return cenarios[pedidos]
+
+
+# Soma ao histograma de cada linha (contagem de cada valor a partir de base[linha]) os valores
+# (linhas, n) de um bloco, com um único bincount. O histograma começa no mínimo de cada linha, então a
+# largura é a maior dispersão e não o maior valor; é alargado quando um bloco sai do intervalo coberto.
+def _acumular_histograma(histograma, base, valores):
+    minimos = valores.min(axis=1).astype(np.int64)
+    maximos = valores.max(axis=1).astype(np.int64)
+    if base is None:
+        base = minimos
+    novo_base = np.minimum(base, minimos)
+    largura = int((np.maximum(base + histograma.shape[1], maximos + 1) - novo_base).max())
+    if largura > histograma.shape[1] or np.any(novo_base < base):
+        alargado = np.zeros((len(base), largura), dtype=np.int64)
+        alargado[np.arange(len(base))[:, None], (base - novo_base)[:, None] + np.arange(histograma.shape[1])] = histograma
+        histograma, base = alargado, novo_base
+    codigos = valores - base[:, None] + (np.arange(len(base)) * histograma.shape[1])[:, None]
+    histograma += np.bincount(codigos.ravel(), minlength=histograma.size).reshape(histograma.shape)
+    return histograma, base
+
+
+# Simulação progressiva do backlog executada em uma thread de fundo.
+# Roda blocos de simulações e, a cada publicar_a_cada blocos, publica a projeção parcial.
+# Para sozinha quando o maior erro padrão das médias semanais do backlog fica abaixo de
+# tolerancia (ou ao atingir max_simulacoes) e pode ser cancelada a qualquer momento,
+# por exemplo quando o usuário muda os filtros no meio da execução.
+# O erro padrão vem da variância entre os blocos (_erro_padrao_backlog), então os métodos com
+# redução de variância param com menos simulações.
+# Se ninguém ler o resultado por abandono segundos (ex.: a sessão do Streamlit foi fechada no meio
+# da execução), a simulação também para. Um erro na thread é guardado e relançado por resultado().
+class SimulacaoProgressiva:
+    def __init__(self, issues_abertas, media_abertos_por_semana, media_fechados_por_semana, num_semanas,
+                 tolerancia=0.5, tamanho_bloco=100, publicar_a_cada=10, max_simulacoes=200_000, rng=None,
+                 amostragem='aleatoria', indice_vida=None, idades_abertas=None, historico=None, semanas_por_bloco=4,
+                 abandono=30):
+        self.media_abertos_por_semana = media_abertos_por_semana
+        self.media_fechados_por_semana = media_fechados_por_semana
+        self.tolerancia = tolerancia
+        self.tamanho_bloco = tamanho_bloco
+        self.publicar_a_cada = publicar_a_cada
+        self.max_simulacoes = max_simulacoes
+        self.amostragem = amostragem
+        self.abandono = abandono
+        # Com indice_vida, os fechamentos vêm da curva de sobrevivência (ver simular_backlog_sobrevivencia)
+        # e media_abertos_por_semana é a chegada de novas issues (média de todas as criadas)
+        self._probabilidades = None
+        if indice_vida is not None:
+            self._probabilidades = _probabilidades_sobrevivencia(indice_vida, idades_abertas, num_semanas)
+        # Com historico = (abertas, fechadas) por semana, as contagens vêm da reamostragem em blocos
+        # (ver simular_backlog_bootstrap)
+        self._historico = None
+        if historico is not None:
+            self._historico = _historico_blocos(*historico, semanas_por_bloco)
+        self.rng = np.random.default_rng() if rng is None else rng
+        self._estado = _novo_estado_backlog(issues_abertas, num_semanas)
+        self._cancelada = threading.Event()
+        self._concluida = threading.Event()
+        self._lock = threading.Lock()
+        self._publicado = (None, 0, np.inf)
+        self._erro = None
+        self._ultima_leitura = time.monotonic()
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+
+    def iniciar(self):
+        self._thread.start()
+        return self
+
+    def cancelar(self):
+        self._cancelada.set()
+
+    @property
+    def concluida(self):
+        return self._concluida.is_set()
+
+    # Última projeção publicada: (tabela por semana, número de simulações, erro padrão máximo)
+    def resultado(self):
+        with self._lock:
+            self._ultima_leitura = time.monotonic()
+            if self._erro is not None:
+                raise self._erro
+            return self._publicado
+
+    def _publicar(self):
+        erro_padrao = float(_erro_padrao_backlog(self._estado).max())
+        resultado = _resumir_backlog(self._estado)
+        with self._lock:
+            self._publicado = (resultado, self._estado['num_simulacoes'], erro_padrao)
+        return erro_padrao
+
+    def _executar(self):
+        try:
+            blocos = 0
+            while not self._cancelada.is_set() and time.monotonic() - self._ultima_leitura <= self.abandono:
+                if self._historico is not None:
+                    _acumular_caminhos_backlog(self._estado, *_sortear_blocos(
+                        self._historico, self.tamanho_bloco, len(self._estado['soma_backlog']), self.rng))
+                elif self._probabilidades is None:
+                    _acumular_bloco_backlog(self._estado, self.media_abertos_por_semana,
+                                            self.media_fechados_por_semana, self.tamanho_bloco, self.rng,
+                                            self.amostragem)
+                else:
+                    _acumular_caminhos_backlog(self._estado, *_sortear_sobrevivencia(
+                        self._probabilidades, self.media_abertos_por_semana, self.tamanho_bloco,
+                        len(self._estado['soma_backlog']), self.rng))
+                blocos += 1
+                atingiu_limite = self._estado['num_simulacoes'] >= self.max_simulacoes
+                # O primeiro bloco é publicado imediatamente para o gráfico aparecer logo
+                if blocos == 1 or blocos % self.publicar_a_cada == 0 or atingiu_limite:
+                    if self._publicar() <= self.tolerancia or atingiu_limite:
+                        break
+        except Exception as erro:
+            with self._lock:
+                self._erro = erro
+        finally:
+            self._concluida.set()
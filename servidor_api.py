@@ -0,0 +1,184 @@
+import argparse
+import asyncio
+import functools
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import pipeline
+import previsao
+
+# Serviço HTTP/JSON local com a mesma cadeia dos apps: carregar -> filtrar -> agregar -> projetar.
+# Os pedidos são atendidos de forma assíncrona (asyncio); a simulação, que usa muita CPU, roda em um
+# pool de processos. Os resultados ficam em um cache compartilhado por todos os clientes e pedidos
+# iguais em andamento esperam a mesma simulação em vez de repeti-la.
+#
+# Rotas:
+#   GET /saude
+#   GET /autores
+#   GET /projetos
+#   GET /previsao?autores=a,b&projetos=x&semanas=12&simulacoes=1000
+#
+# Uso: python servidor_api.py --origem dados_consulta.xlsx --porta 8765
+
+MAX_SEMANAS = 52
+MAX_SIMULACOES = 200_000
+
+
+class ServicoPrevisao:
+    def __init__(self, origem, processos=None, tamanho_cache=256):
+        # A tabela e os índices vêm da cadeia dos apps (pipeline.py), com a assinatura dos arquivos
+        # fixada na partida: todos os pedidos usam a mesma versão das exportações
+        self.origem = dict(origem=origem, assinatura_origem=pipeline.executar('assinatura_origem', origem=origem))
+        self.tabela, self.indice = pipeline.executar(['tabela', 'indice'], **self.origem)
+        self.pool = ProcessPoolExecutor(max_workers=processos)
+        self.tamanho_cache = tamanho_cache
+        self.cache = OrderedDict()
+        self.em_andamento = {}
+
+    # Totais e médias semanais das issues dos autores e projetos pedidos (vazio = todos), calculados
+    # pela etapa 'taxas' da cadeia numa thread, sem bloquear o laço de eventos dos outros clientes
+    async def taxas(self, autores, projetos):
+        return await asyncio.get_running_loop().run_in_executor(None, functools.partial(
+            pipeline.executar, 'taxas', autores=autores or None, projetos=projetos or None, **self.origem))
+
+    async def previsao(self, autores, projetos, semanas, simulacoes):
+        chave = (autores, projetos, semanas, simulacoes)
+        if chave in self.cache:
+            self.cache.move_to_end(chave)
+            return self.cache[chave]
+        # Pedido igual já em andamento: aguarda o mesmo resultado
+        if chave in self.em_andamento:
+            return await asyncio.shield(self.em_andamento[chave])
+
+        futuro = asyncio.get_running_loop().create_future()
+        self.em_andamento[chave] = futuro
+        try:
+            taxas = await self.taxas(autores, projetos)
+            projecao = await asyncio.get_running_loop().run_in_executor(
+                self.pool, previsao.simular_backlog, int(taxas['issues_abertas']),
+                float(taxas['media_abertos_por_semana']), float(taxas['media_fechados_por_semana']),
+                simulacoes, semanas)
+            resposta = _para_json({
+                'autores': list(autores),
+                'projetos': list(projetos),
+                'semanas': semanas,
+                'simulacoes': simulacoes,
+                'issues_abertas': int(taxas['issues_abertas']),
+                'issues_fechadas': int(taxas['issues_fechadas']),
+                'media_abertos_por_semana': float(taxas['media_abertos_por_semana']),
+                'media_fechados_por_semana': float(taxas['media_fechados_por_semana']),
+                'projecao': projecao.reset_index().to_dict(orient='list'),
+            })
+            self.cache[chave] = resposta
+            if len(self.cache) > self.tamanho_cache:
+                self.cache.popitem(last=False)
+            futuro.set_result(resposta)
+            return resposta
+        except Exception as erro:
+            futuro.set_exception(erro)
+            # Marca a exceção como consumida caso ninguém mais esteja aguardando
+            futuro.exception()
+            raise
+        finally:
+            del self.em_andamento[chave]
+
+    async def atender(self, metodo, caminho):
+        if metodo != 'GET':
+            return 405, {'erro': 'Método não permitido'}
+        url = urlsplit(caminho)
+        parametros = parse_qs(url.query)
+        if url.path == '/saude':
+            return 200, {'status': 'ok', 'linhas': len(self.tabela), 'cache': len(self.cache)}
+        if url.path == '/autores':
+            return 200, self.indice.valores(previsao.COLUNA_AUTOR)
+        if url.path == '/projetos':
+            return 200, self.indice.valores(previsao.COLUNA_PROJETO)
+        if url.path == '/previsao':
+            try:
+                semanas = int(parametros.get('semanas', ['12'])[0])
+                simulacoes = int(parametros.get('simulacoes', ['1000'])[0])
+            except ValueError:
+                return 400, {'erro': 'semanas e simulacoes devem ser inteiros'}
+            if not 1 <= semanas <= MAX_SEMANAS or not 1 <= simulacoes <= MAX_SIMULACOES:
+                return 400, {'erro': f'semanas deve estar entre 1 e {MAX_SEMANAS} e simulacoes entre 1 e {MAX_SIMULACOES}'}
+            autores = _lista_parametro(parametros, 'autores')
+            projetos = _lista_parametro(parametros, 'projetos')
+            return 200, await self.previsao(autores, projetos, semanas, simulacoes)
+        return 404, {'erro': 'Rota não encontrada'}
+
+    # Conexão HTTP/1.1 com keep-alive: lê pedidos até o cliente fechar a conexão
+    async def conexao(self, leitor, escritor):
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                metodo, caminho, _ = linha.decode('latin-1').split(' ', 2)
+                cabecalhos = {}
+                while True:
+                    cabecalho = await leitor.readline()
+                    if cabecalho in (b'\r\n', b'\n', b''):
+                        break
+                    nome, _, valor = cabecalho.decode('latin-1').partition(':')
+                    cabecalhos[nome.strip().lower()] = valor.strip()
+                if int(cabecalhos.get('content-length', 0)):
+                    await leitor.readexactly(int(cabecalhos['content-length']))
+
+                try:
+                    codigo, corpo = await self.atender(metodo, caminho)
+                except Exception as erro:
+                    codigo, corpo = 500, {'erro': str(erro)}
+                conteudo = corpo if isinstance(corpo, bytes) else _para_json(corpo)
+                fechar = cabecalhos.get('connection', '').lower() == 'close'
+                escritor.write(
+                    f"HTTP/1.1 {codigo} {_RAZOES.get(codigo, '')}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(conteudo)}\r\n"
+                    f"Connection: {'close' if fechar else 'keep-alive'}\r\n\r\n".encode('latin-1') + conteudo)
+                await escritor.drain()
+                if fechar:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+
+_RAZOES = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+# Lista ordenada e sem repetições a partir de um parâmetro "a,b,c" (a ordem não muda o cache)
+def _lista_parametro(parametros, nome):
+    valores = []
+    for valor in parametros.get(nome, []):
+        valores.extend(item.strip() for item in valor.split(',') if item.strip())
+    return tuple(sorted(set(valores)))
+
+
+def _para_json(dados):
+    return json.dumps(dados, ensure_ascii=False, default=lambda valor: valor.item()).encode('utf-8')
+
+
+async def servir(origem, host='127.0.0.1', porta=8765, processos=None):
+    inicio = time.perf_counter()
+    servico = ServicoPrevisao(origem, processos)
+    servidor = await asyncio.start_server(servico.conexao, host, porta)
+    print(f"Dados carregados em {time.perf_counter() - inicio:.2f}s; servindo em http://{host}:{porta}")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        servico.pool.shutdown(cancel_futures=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serviço HTTP/JSON de projeção de issues")
+    parser.add_argument('--origem', default="dados_consulta.xlsx", help="arquivo, diretório ou padrão glob das exportações")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=8765)
+    parser.add_argument('--processos', type=int, default=None, help="processos do pool de simulação")
+    argumentos = parser.parse_args()
+    asyncio.run(servir(argumentos.origem, argumentos.host, argumentos.porta, argumentos.processos))
@@ -0,0 +1,272 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import ssl
+import time
+import warnings
+from urllib.parse import urlencode, urlsplit
+
+import pandas as pd
+
+import ingestao
+
+# Leitura das issues direto da API do SonarQube (api/issues/search), sem a exportação manual da
+# planilha "Resultado da consulta". As páginas são pedidas em paralelo (asyncio) por um conjunto
+# fixo de conexões HTTP/1.1 reaproveitadas (keep-alive); respostas 429/5xx e falhas de conexão são
+# repetidas com espera exponencial. Cada página vira um lote com as mesmas colunas e tipos das
+# exportações (ingestao), então a tabela montada serve para os apps e para a cadeia de projeção.
+# A API não devolve mais de 10.000 issues por consulta: intervalos maiores são divididos por data
+# de criação (createdAfter/createdBefore) até caberem no limite. Se mais de 10.000 issues tiverem
+# sido criadas no mesmo segundo, só as primeiras são recebidas e um aviso (warnings) informa quantas faltam.
+# Atualização incremental: guardando as issues em um .csv no formato da exportação, cada nova
+# execução só pede as criadas depois da última data já gravada (createdAfter).
+#
+# Uso: python sonar.py --url https://sonar.exemplo.com --projetos frontend,backend --saida issues_sonar.csv
+#      (depois: DADOS_CONSULTA=issues_sonar.csv streamlit run main15.py)
+
+CAMINHO_BUSCA = '/api/issues/search'
+TAMANHO_PAGINA = 500
+LIMITE_RESULTADOS = 10_000
+STATUS_REPETIR = {429, 500, 502, 503, 504}
+# Campo da API -> coluna da exportação
+CAMPOS = {
+    'project': 'Projects - Project UUID__kee',
+    'message': 'message',
+    'assignee': 'assignee',
+    'author': 'author_login',
+    'line': 'line',
+    'status': 'status',
+    'resolution': 'resolution',
+    'severity': 'severity',
+    'creationDate': 'issue_creation_date',
+    'updateDate': 'issue_update_date',
+    'closeDate': 'issue_close_date',
+    'tags': 'tags',
+}
+COLUNA_CHAVE = 'key'
+
+
+# Cliente HTTP assíncrono com um conjunto de conexões reaproveitadas e repetição com espera
+# exponencial (com variação aleatória) nas respostas 429/5xx e em falhas de conexão.
+# Cada tentativa (conexão, envio e leitura da resposta) tem até tempo_limite segundos: um servidor
+# parado conta como falha e é repetido, em vez de travar a leitura inteira.
+class ClienteSonar:
+    def __init__(self, url, token=None, conexoes=8, tentativas=5, espera_inicial=0.5, espera_maxima=30, tempo_limite=60):
+        partes = urlsplit(url)
+        self.host = partes.hostname
+        self.ssl = ssl.create_default_context() if partes.scheme == 'https' else None
+        self.porta = partes.port or (443 if self.ssl else 80)
+        self.prefixo = partes.path.rstrip('/')
+        # Token de usuário do SonarQube: autenticação básica com o token como usuário e senha vazia
+        self.autorizacao = base64.b64encode(f"{token}:".encode()).decode() if token else None
+        self.tentativas = tentativas
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.tempo_limite = tempo_limite
+        self.pedidos = 0
+        self.repeticoes = 0
+        self._vagas = asyncio.Semaphore(conexoes)
+        self._livres = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *erro):
+        await self.fechar()
+
+    async def fechar(self):
+        while self._livres:
+            _, escritor = self._livres.pop()
+            escritor.close()
+
+    # GET com os parâmetros da consulta; devolve o JSON da resposta
+    async def get_json(self, caminho, parametros):
+        alvo = f"{self.prefixo}{caminho}?{urlencode(parametros)}"
+        for tentativa in range(self.tentativas):
+            async with self._vagas:
+                conexao = self._livres.pop() if self._livres else None
+                try:
+                    conexao, (status, cabecalhos, corpo) = await asyncio.wait_for(self._conectar_e_pedir(conexao, alvo), self.tempo_limite)
+                except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, IndexError) as erro:
+                    status, cabecalhos, corpo = None, {}, (str(erro) or type(erro).__name__).encode()
+                else:
+                    if cabecalhos.get('connection', '').lower() == 'close':
+                        conexao[1].close()
+                    else:
+                        self._livres.append(conexao)
+            self.pedidos += 1
+            if status == 200:
+                return json.loads(corpo)
+            if status is not None and status not in STATUS_REPETIR:
+                raise ConnectionError(f"SonarQube respondeu {status} em {alvo}: {corpo[:200].decode(errors='replace')}")
+            if tentativa + 1 < self.tentativas:
+                self.repeticoes += 1
+                espera = min(self.espera_maxima, self.espera_inicial * 2 ** tentativa) * random.uniform(0.5, 1)
+                if 'retry-after' in cabecalhos and cabecalhos['retry-after'].isdigit():
+                    espera = max(espera, int(cabecalhos['retry-after']))
+                await asyncio.sleep(espera)
+        raise ConnectionError(f"SonarQube não respondeu em {alvo} após {self.tentativas} tentativas (último status: {status})")
+
+    # Abre uma conexão, se não veio uma livre, e faz o pedido. Em erro ou cancelamento (tempo
+    # esgotado no wait_for) a conexão é fechada e não volta para as livres.
+    async def _conectar_e_pedir(self, conexao, alvo):
+        if conexao is None:
+            conexao = await asyncio.open_connection(self.host, self.porta, ssl=self.ssl)
+        try:
+            return conexao, await self._pedir(conexao, alvo)
+        except BaseException:
+            conexao[1].close()
+            raise
+
+    async def _pedir(self, conexao, alvo):
+        leitor, escritor = conexao
+        autorizacao = f"Authorization: Basic {self.autorizacao}\r\n" if self.autorizacao else ""
+        escritor.write(f"GET {alvo} HTTP/1.1\r\nHost: {self.host}\r\nAccept: application/json\r\n{autorizacao}\r\n".encode('latin-1'))
+        await escritor.drain()
+        status = int((await leitor.readline()).split()[1])
+        cabecalhos = {}
+        while True:
+            cabecalho = await leitor.readline()
+            if cabecalho in (b'\r\n', b'\n', b''):
+                break
+            nome, _, valor = cabecalho.decode('latin-1').partition(':')
+            cabecalhos[nome.strip().lower()] = valor.strip()
+        if cabecalhos.get('transfer-encoding', '').lower() == 'chunked':
+            partes = []
+            while True:
+                tamanho = int((await leitor.readline()).split(b';')[0], 16)
+                if tamanho == 0:
+                    await leitor.readline()
+                    break
+                partes.append(await leitor.readexactly(tamanho))
+                await leitor.readline()
+            corpo = b''.join(partes)
+        else:
+            corpo = await leitor.readexactly(int(cabecalhos.get('content-length', 0)))
+        return status, cabecalhos, corpo
+
+
+# Data no formato aceito por createdAfter/createdBefore
+def formatar_data(data):
+    return pd.Timestamp(data).strftime('%Y-%m-%dT%H:%M:%S+0000')
+
+
+# Converte as issues de uma página em um lote com as colunas e tipos das exportações.
+# As datas da API vêm com fuso (+0000) e são guardadas em UTC sem fuso, como nas planilhas.
+def pagina_para_lote(issues):
+    lote = pd.DataFrame({
+        COLUNA_CHAVE: [issue.get('key') for issue in issues],
+        **{coluna: [issue.get(campo) for issue in issues] for campo, coluna in CAMPOS.items()},
+    })
+    lote['tags'] = [','.join(tags) if tags else None for tags in lote['tags']]
+    for coluna in ingestao.COLUNAS_DATA:
+        if coluna in lote.columns:
+            lote[coluna] = pd.to_datetime(lote[coluna], utc=True, format='ISO8601').dt.tz_convert(None)
+    return lote
+
+
+# Busca as issues da consulta (ex.: {'componentKeys': 'frontend'}) criadas em [criado_depois,
+# criado_antes). Cada página recebida é convertida e entregue a ao_receber(lote), na ordem em que
+# chegam. Retorna o número de issues recebidas.
+async def buscar_issues(cliente, consulta, ao_receber, criado_depois=None, criado_antes=None):
+    async def pagina(inicio, fim, numero):
+        parametros = {**consulta, 'ps': TAMANHO_PAGINA, 'p': numero, 's': 'CREATION_DATE', 'asc': 'true'}
+        if inicio is not None:
+            parametros['createdAfter'] = formatar_data(inicio)
+        if fim is not None:
+            parametros['createdBefore'] = formatar_data(fim)
+        return await cliente.get_json(CAMINHO_BUSCA, parametros)
+
+    async def intervalo(inicio, fim):
+        primeira = await pagina(inicio, fim, 1)
+        total = primeira.get('paging', {}).get('total', primeira.get('total', 0))
+        issues = primeira.get('issues', [])
+        if total > LIMITE_RESULTADOS and issues:
+            # Mais issues do que a API pagina: divide o intervalo pela data de criação. O começo é a
+            # primeira issue (ordem crescente) e o fim, se não informado, o momento atual.
+            inicio_dados = pd.Timestamp(issues[0]['creationDate']).tz_convert(None).floor('s')
+            fim_dados = pd.Timestamp(fim) if fim is not None else pd.Timestamp.now(tz='UTC').tz_convert(None).ceil('s') + pd.Timedelta(seconds=1)
+            meio = (inicio_dados + (fim_dados - inicio_dados) / 2).floor('s')
+            if inicio_dados < meio < fim_dados:
+                contagens = await asyncio.gather(intervalo(inicio_dados, meio), intervalo(meio, fim_dados))
+                return sum(contagens)
+            # Mais issues criadas no mesmo segundo do que o limite: a data não divide mais o intervalo
+            # e a API só entrega as primeiras; avisa quantas ficaram de fora em vez de perdê-las em silêncio
+            warnings.warn(f"{total - LIMITE_RESULTADOS} de {total} issues criadas entre {formatar_data(inicio_dados)} e "
+                          f"{formatar_data(fim_dados)} não foram recebidas: a API devolve no máximo {LIMITE_RESULTADOS} "
+                          f"issues por consulta e o intervalo não pode ser dividido pela data de criação")
+        ao_receber(pagina_para_lote(issues))
+        num_paginas = -(-min(total, LIMITE_RESULTADOS) // TAMANHO_PAGINA)
+
+        async def receber(numero):
+            resposta = await pagina(inicio, fim, numero)
+            ao_receber(pagina_para_lote(resposta.get('issues', [])))
+            return len(resposta.get('issues', []))
+
+        restantes = await asyncio.gather(*(receber(numero) for numero in range(2, num_paginas + 1)))
+        return len(issues) + sum(restantes)
+
+    return await intervalo(criado_depois, criado_antes)
+
+
+# Monta a tabela de issues da consulta a partir dos lotes recebidos: uma linha por issue (a
+# versão mais recente, se a mesma issue vier duas vezes) e colunas 'category' como em ingestao
+def montar_tabela(lotes):
+    lotes = [lote for lote in lotes if not lote.empty]
+    if not lotes:
+        return pagina_para_lote([])
+    df = pd.concat(lotes, ignore_index=True)
+    df = df.drop_duplicates(COLUNA_CHAVE, keep='last').sort_values('issue_creation_date', kind='stable', ignore_index=True)
+    for coluna in ingestao.COLUNAS_CATEGORIA:
+        if coluna in df.columns:
+            df[coluna] = df[coluna].astype('category')
+    return df
+
+
+# Carrega as issues dos projetos (None = todos os visíveis para o token) em uma tabela tipada
+async def carregar_sonar_async(url, projetos=None, token=None, criado_depois=None, conexoes=8):
+    lotes = []
+    consulta = {'componentKeys': ','.join(projetos)} if projetos else {}
+    async with ClienteSonar(url, token, conexoes) as cliente:
+        await buscar_issues(cliente, consulta, lotes.append, criado_depois)
+    return montar_tabela(lotes)
+
+
+def carregar_sonar(url, projetos=None, token=None, criado_depois=None, conexoes=8):
+    return asyncio.run(carregar_sonar_async(url, projetos, token, criado_depois, conexoes))
+
+
+# Atualiza um .csv no formato da exportação com as issues novas: só pede as criadas a partir da
+# última data gravada e substitui as issues repetidas pela versão recebida agora.
+# Issues antigas que mudaram de status desde a última leitura só são atualizadas em uma carga completa.
+def atualizar_exportacao(caminho, url, projetos=None, token=None, conexoes=8, completa=False):
+    anterior = None
+    criado_depois = None
+    if os.path.exists(caminho) and not completa:
+        anterior = ingestao.ler_exportacao(caminho).drop(columns='arquivo_origem')
+        if not anterior.empty:
+            criado_depois = anterior['issue_creation_date'].max()
+    novas = carregar_sonar(url, projetos, token, criado_depois, conexoes)
+    df = novas if anterior is None else montar_tabela([anterior, novas])
+    temporario = f"{caminho}.tmp"
+    df.to_csv(temporario, index=False)
+    os.replace(temporario, caminho)
+    return df, len(novas)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Lê as issues da API do SonarQube para um .csv no formato da exportação")
+    parser.add_argument('--url', required=True, help="endereço do SonarQube (ex.: https://sonar.exemplo.com)")
+    parser.add_argument('--projetos', default='', help="chaves dos projetos separadas por vírgula (vazio = todos)")
+    parser.add_argument('--token', default=os.environ.get('SONAR_TOKEN'), help="token de usuário (padrão: variável SONAR_TOKEN)")
+    parser.add_argument('--saida', default='issues_sonar.csv')
+    parser.add_argument('--conexoes', type=int, default=8, help="conexões HTTP simultâneas")
+    parser.add_argument('--completa', action='store_true', help="ignora o arquivo existente e lê todas as issues")
+    argumentos = parser.parse_args()
+    projetos = [projeto.strip() for projeto in argumentos.projetos.split(',') if projeto.strip()]
+    inicio = time.perf_counter()
+    df, novas = atualizar_exportacao(argumentos.saida, argumentos.url, projetos, argumentos.token, argumentos.conexoes, argumentos.completa)
+    print(f"{novas} issues recebidas, {len(df)} no total em {argumentos.saida} ({time.perf_counter() - inicio:.1f}s)")
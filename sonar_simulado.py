@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import random
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+import sonar
+
+# Servidor local que imita a rota api/issues/search do SonarQube, para testar sonar.py sem um
+# SonarQube de verdade: paginação (p, ps até 500), limite de 10.000 resultados por consulta,
+# filtros componentKeys, createdAfter (inclusivo) e createdBefore (exclusivo), ordem por data de
+# criação e, opcionalmente, atraso e falhas aleatórias (429 com Retry-After e 503) para exercitar
+# a repetição com espera do cliente.
+#
+# Uso: python sonar_simulado.py --issues 30000 --porta 9000 --taxa-falhas 0.05
+#      python sonar.py --url http://127.0.0.1:9000 --saida issues_sonar.csv
+
+STATUS_SIMULADOS = ['OPEN', 'CLOSED', 'REOPENED', 'CONFIRMED']
+TAGS_SIMULADAS = [[], ['accessibility'], ['accessibility', 'wcag2-a'], ['unused'], ['cwe'], ['es2015', 'type-dependent', 'unused']]
+MENSAGENS_SIMULADAS = ["Remove this unused import of '{}'.", "A página contém palavras que não são em português: {}",
+                       "Remove this commented out code.", "Unexpected empty method '{}'."]
+
+
+# Issues sintéticas no formato da API, ordenadas pela data de criação
+def gerar_issues(num_issues, num_autores=10, num_projetos=3, num_semanas=52, semente=0, inicio='2024-01-01', primeira_chave=0):
+    rng = np.random.default_rng(semente)
+    criacao = pd.Timestamp(inicio, tz='UTC') + pd.to_timedelta(np.sort(rng.uniform(0, 7 * num_semanas, num_issues)), unit='D')
+    fechamento = criacao + pd.to_timedelta(rng.exponential(30, num_issues), unit='D')
+    status = rng.choice(STATUS_SIMULADOS, num_issues, p=[0.6, 0.3, 0.07, 0.03])
+    palavras = ['name', 'Input', 'HttpClient', 'refresh', 'the', 'key']
+    issues = []
+    for i in range(num_issues):
+        issue = {
+            'key': f"AX{primeira_chave + i:08d}",
+            'rule': 'simulada:S0000',
+            'severity': str(rng.choice(['MAJOR', 'MINOR', 'CRITICAL'])),
+            'project': f"projeto{rng.integers(num_projetos)}",
+            'message': str(rng.choice(MENSAGENS_SIMULADAS)).format(rng.choice(palavras)),
+            'author': f"autor{rng.integers(num_autores)}",
+            'line': int(rng.integers(1, 500)),
+            'status': str(status[i]),
+            'tags': TAGS_SIMULADAS[rng.integers(len(TAGS_SIMULADAS))],
+            'creationDate': criacao[i].strftime('%Y-%m-%dT%H:%M:%S+0000'),
+            'updateDate': criacao[i].strftime('%Y-%m-%dT%H:%M:%S+0000'),
+        }
+        if status[i] == 'CLOSED':
+            issue['resolution'] = 'FIXED'
+            issue['closeDate'] = fechamento[i].strftime('%Y-%m-%dT%H:%M:%S+0000')
+        issues.append(issue)
+    return issues
+
+
+class SonarSimulado:
+    def __init__(self, issues, taxa_falhas=0.0, atraso=0.0, semente=0):
+        self.taxa_falhas = taxa_falhas
+        self.atraso = atraso
+        self.aleatorio = random.Random(semente)
+        self.pedidos = 0
+        self.falhas = 0
+        self.conexoes = set()
+        self.issues = []
+        self.datas = np.empty(0, dtype='datetime64[s]')
+        self.adicionar(issues)
+
+    # Novas issues (ex.: para testar a atualização incremental), mantendo a ordem por criação
+    def adicionar(self, issues):
+        self.issues = sorted(self.issues + list(issues), key=lambda issue: issue['creationDate'])
+        self.datas = np.array([_data(issue['creationDate']) for issue in self.issues], dtype='datetime64[s]')
+
+    def buscar(self, parametros):
+        pagina = int(parametros.get('p', ['1'])[0])
+        tamanho = int(parametros.get('ps', ['100'])[0])
+        if not 1 <= tamanho <= 500:
+            return 400, {'errors': [{'msg': "'ps' value must be between 1 and 500"}]}
+        if pagina * tamanho > sonar.LIMITE_RESULTADOS:
+            return 400, {'errors': [{'msg': f"Can return only the first {sonar.LIMITE_RESULTADOS} results."}]}
+        inicio, fim = 0, len(self.issues)
+        if 'createdAfter' in parametros:
+            inicio = int(np.searchsorted(self.datas, _data(parametros['createdAfter'][0]), side='left'))
+        if 'createdBefore' in parametros:
+            fim = int(np.searchsorted(self.datas, _data(parametros['createdBefore'][0]), side='left'))
+        selecao = self.issues[inicio:max(inicio, fim)]
+        if 'componentKeys' in parametros:
+            projetos = set(parametros['componentKeys'][0].split(','))
+            selecao = [issue for issue in selecao if issue['project'] in projetos]
+        if parametros.get('asc', ['true'])[0] == 'false':
+            selecao = selecao[::-1]
+        return 200, {
+            'total': len(selecao),
+            'p': pagina,
+            'ps': tamanho,
+            'paging': {'pageIndex': pagina, 'pageSize': tamanho, 'total': len(selecao)},
+            'issues': selecao[(pagina - 1) * tamanho:pagina * tamanho],
+        }
+
+    async def conexao(self, leitor, escritor):
+        self.conexoes.add(escritor)
+        try:
+            while True:
+                linha = await leitor.readline()
+                if not linha:
+                    break
+                _, caminho, _ = linha.decode('latin-1').split(' ', 2)
+                while (await leitor.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                self.pedidos += 1
+                if self.atraso:
+                    await asyncio.sleep(self.atraso)
+                cabecalhos = ""
+                url = urlsplit(caminho)
+                if self.aleatorio.random() < self.taxa_falhas:
+                    self.falhas += 1
+                    codigo, corpo = self.aleatorio.choice([(429, {'errors': [{'msg': 'Too many requests'}]}),
+                                                           (503, {'errors': [{'msg': 'Service unavailable'}]})])
+                    if codigo == 429:
+                        cabecalhos = "Retry-After: 0\r\n"
+                elif url.path == sonar.CAMINHO_BUSCA:
+                    codigo, corpo = self.buscar(parse_qs(url.query))
+                else:
+                    codigo, corpo = 404, {'errors': [{'msg': 'Unknown url'}]}
+                conteudo = json.dumps(corpo).encode('utf-8')
+                escritor.write(f"HTTP/1.1 {codigo} {_RAZOES[codigo]}\r\nContent-Type: application/json\r\n{cabecalhos}"
+                               f"Content-Length: {len(conteudo)}\r\n\r\n".encode('latin-1') + conteudo)
+                await escritor.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.conexoes.discard(escritor)
+            escritor.close()
+
+    async def iniciar(self, host='127.0.0.1', porta=0):
+        self.servidor = await asyncio.start_server(self.conexao, host, porta)
+        return self.servidor.sockets[0].getsockname()[1]
+
+    # Fecha o servidor e as conexões abertas, esperando cada uma terminar
+    async def fechar(self):
+        self.servidor.close()
+        for escritor in list(self.conexoes):
+            escritor.close()
+        while self.conexoes:
+            await asyncio.sleep(0.01)
+        await self.servidor.wait_closed()
+
+
+_RAZOES = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 429: 'Too Many Requests', 503: 'Service Unavailable'}
+
+
+# Data (com ou sem fuso) como datetime64 em UTC
+def _data(texto):
+    data = pd.Timestamp(texto)
+    if data.tzinfo is not None:
+        data = data.tz_convert(None)
+    return np.datetime64(data, 's')
+
+
+async def servir(num_issues, host, porta, taxa_falhas, atraso):
+    simulado = SonarSimulado(gerar_issues(num_issues), taxa_falhas, atraso)
+    porta = await simulado.iniciar(host, porta)
+    print(f"SonarQube simulado com {num_issues} issues em http://{host}:{porta}")
+    async with simulado.servidor:
+        await simulado.servidor.serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="SonarQube simulado (api/issues/search) para testar sonar.py")
+    parser.add_argument('--issues', type=int, default=30_000)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--porta', type=int, default=9000)
+    parser.add_argument('--taxa-falhas', type=float, default=0.0, help="fração dos pedidos respondidos com 429/503")
+    parser.add_argument('--atraso', type=float, default=0.0, help="atraso de cada resposta (s)")
+    argumentos = parser.parse_args()
+    asyncio.run(servir(argumentos.issues, argumentos.host, argumentos.porta, argumentos.taxa_falhas, argumentos.atraso))
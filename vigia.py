@@ -0,0 +1,153 @@
+import hashlib
+import os
+import threading
+import time
+
+import ingestao
+
+# Vigia em segundo plano das exportações (ou do banco embutido) usadas pelos dashboards.
+# Uma thread confere a cada intervalo o tamanho e a data de modificação dos arquivos; quando
+# mudam e ficam estáveis por uma verificação (o arquivo não está mais sendo copiado), o conteúdo é
+# resumido (sha256) e, se for diferente do publicado, a thread lê a tabela, monta os índices,
+# as contagens semanais e as etapas da página padrão na cadeia (pipeline.py) com a nova assinatura. Só
+# depois a assinatura publicada é trocada, de uma vez: as sessões passam a assinatura publicada
+# para a cadeia e sempre encontram as etapas prontas em cache, sem esperar a leitura.
+# Se a nova exportação falhar na leitura, a assinatura anterior continua publicada.
+#
+# Uso: origem = vigia.vigiar(pipeline.PIPELINE, ['taxas', 'projecao'], origem="dados_consulta.xlsx").parametros()
+#      pipeline.executar('taxas', autores=('fulano',), **origem)
+# Um alvo também pode ser um par (etapa, parâmetros), para aquecer a etapa com os valores iniciais
+# dos controles da página quando diferem de pipeline.PARAMETROS_PADRAO
+
+INTERVALO_PADRAO = 2.0
+TAMANHO_BLOCO_RESUMO = 1 << 20
+
+
+class Vigia:
+    def __init__(self, cadeia, alvos, intervalo=INTERVALO_PADRAO, **origem):
+        self.cadeia = cadeia
+        self.alvos = list(alvos)
+        self.intervalo = intervalo
+        self.origem = origem
+        # Parâmetro da cadeia que recebe a assinatura (a etapa volátil que ele substitui)
+        self.nome_assinatura = 'assinatura_banco' if 'caminho_banco' in origem else 'assinatura_origem'
+        self.assinatura = None
+        self.atualizado_em = None
+        self.erro = None
+        self.aquecimentos = 0
+        # Tamanho e data dos arquivos na última verificação, no conteúdo publicado e no último com erro
+        self._estado_visto = None
+        self._estado_publicado = None
+        self._estado_com_erro = None
+        self._publicada = threading.Event()
+        self._parar = threading.Event()
+        self._trava = threading.Lock()
+        self._thread = None
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    # Acrescenta etapas ao aquecimento (ex.: outro app servido pelo mesmo processo)
+    def acrescentar_alvos(self, alvos):
+        with self._trava:
+            self.alvos += [alvo for alvo in alvos if alvo not in self.alvos]
+
+    # Parâmetros de origem com a última assinatura aquecida; só espera na primeira leitura do processo
+    def parametros(self, timeout=None):
+        if not self._publicada.wait(timeout):
+            raise TimeoutError("A primeira leitura das exportações ainda não terminou")
+        if self.assinatura is None:
+            raise self.erro
+        with self._trava:
+            return {**self.origem, self.nome_assinatura: self.assinatura}
+
+    def arquivos(self):
+        if 'caminho_banco' in self.origem:
+            return [self.origem['caminho_banco']]
+        return ingestao.listar_exportacoes(self.origem['origem'])
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                self.verificar()
+            except Exception as erro:
+                # Mantém a assinatura anterior; na primeira leitura, libera as sessões com o erro
+                self.erro = erro
+                self._publicada.set()
+            self._parar.wait(self.intervalo)
+
+    # Uma verificação: aquece e publica se o conteúdo mudou (retorna True quando publicou)
+    def verificar(self):
+        estado = tuple((arquivo, os.stat(arquivo).st_size, os.stat(arquivo).st_mtime_ns) for arquivo in self.arquivos())
+        if estado in (self._estado_publicado, self._estado_com_erro):
+            return False
+        # Espera o arquivo ficar estável por uma verificação antes de ler (exceto na primeira leitura)
+        estavel = estado == self._estado_visto
+        self._estado_visto = estado
+        if self.assinatura is not None and not estavel:
+            return False
+        assinatura = tuple((arquivo, _resumo_arquivo(arquivo)) for arquivo, _, _ in estado)
+        if assinatura != self.assinatura:
+            try:
+                self.aquecer(assinatura)
+            except Exception:
+                # Não tenta ler de novo o mesmo arquivo com erro; espera a próxima mudança
+                self._estado_com_erro = estado
+                raise
+        with self._trava:
+            publicou = assinatura != self.assinatura
+            if publicou:
+                self.assinatura = assinatura
+                self.atualizado_em = time.time()
+                self.aquecimentos += 1
+            self._estado_publicado = estado
+            self.erro = None
+        self._publicada.set()
+        return publicou
+
+    # Calcula na cadeia as etapas dos apps com a assinatura nova e a seleção padrão (todos os autores).
+    # As etapas ficam fixas no cache até o próximo aquecimento, liberando as da assinatura anterior.
+    def aquecer(self, assinatura):
+        origem = {**self.origem, self.nome_assinatura: assinatura}
+        opcoes = self.cadeia.executar('opcoes', **origem)
+        with self._trava:
+            alvos = ['opcoes'] + self.alvos
+        grupo = repr(sorted(self.origem.items()))
+        self.cadeia.fixar(grupo, [alvo for alvo in alvos if isinstance(alvo, str)], autores=opcoes['autores'], **origem)
+        # Etapas com parâmetros próprios: um grupo fixo por alvo (a posição na lista não muda)
+        for posicao, alvo in enumerate(alvos):
+            if not isinstance(alvo, str):
+                nome, parametros = alvo
+                self.cadeia.fixar(f"{grupo} {posicao}", nome, **{'autores': opcoes['autores'], **parametros, **origem})
+
+
+# Resumo sha256 do conteúdo do arquivo, lido em blocos
+def _resumo_arquivo(caminho):
+    resumo = hashlib.sha256()
+    with open(caminho, 'rb') as arquivo:
+        for bloco in iter(lambda: arquivo.read(TAMANHO_BLOCO_RESUMO), b''):
+            resumo.update(bloco)
+    return resumo.hexdigest()
+
+
+VIGIAS = {}
+_TRAVA_VIGIAS = threading.Lock()
+
+
+# Vigia compartilhado pelo processo para a cadeia e a origem (no Streamlit, por todas as sessões);
+# é iniciado no primeiro pedido e os apps seguintes só acrescentam suas etapas ao aquecimento
+def vigiar(cadeia, alvos, intervalo=INTERVALO_PADRAO, **origem):
+    chave = (id(cadeia),) + tuple(sorted(origem.items()))
+    with _TRAVA_VIGIAS:
+        vigia = VIGIAS.get(chave)
+        if vigia is None:
+            vigia = VIGIAS[chave] = Vigia(cadeia, alvos, intervalo, **origem).iniciar()
+    vigia.acrescentar_alvos(alvos)
+    return vigia